@@ -0,0 +1,177 @@
+class AudioError(Exception):
+    """音频后端的错误, 对应 pygame.error"""
+
+
+class PygameAudioBackend:
+    """用 pygame.mixer.music 播放音乐
+
+    pygame 在第一次 init 时才导入, 只显示字幕时不加载音频库。
+    pygame.error 统一转换为 AudioError
+    """
+
+    def __init__(self):
+        self.pygame = None
+
+    def _music(self):
+        return self.pygame.mixer.music
+
+    def _call(self, func, *args, **kwargs):
+        try:
+            return func(*args, **kwargs)
+        except self.pygame.error as e:
+            raise AudioError(str(e)) from e
+
+    def init(self):
+        if self.pygame is None:
+            import pygame
+            self.pygame = pygame
+        self._call(self.pygame.mixer.init)
+
+    def quit(self):
+        if self.pygame is not None:
+            self._call(self.pygame.mixer.quit)
+
+    def load(self, path):
+        self._call(self._music().load, path)
+
+    def play(self, start=0.0):
+        self._call(self._music().play, start=start)
+
+    def queue(self, path):
+        self._call(self._music().queue, path)
+
+    def stop(self):
+        self._call(self._music().stop)
+
+    def pause(self):
+        self._call(self._music().pause)
+
+    def unpause(self):
+        self._call(self._music().unpause)
+
+    def set_volume(self, volume):
+        self._call(self._music().set_volume, volume)
+
+    def get_pos(self):
+        """从最近一次 play(或切换到队列中的下一首)开始的播放时间(毫秒), 未播放时为 -1"""
+        return self._call(self._music().get_pos)
+
+    def get_busy(self):
+        return self._call(self._music().get_busy)
+
+
+class NullAudioBackend:
+    """不发声的音频后端, 按 time_source 推算播放进度
+
+    行为与 pygame.mixer.music 一致: get_pos 从 play 开始计时,
+    播放到结尾时自动切换到 queue 中的下一首并从 0 重新计时,
+    暂停时 get_busy 为 False。duration_of(路径) 返回时长(秒),
+    返回 None 表示无限长。用于无声卡、无显示器的测试和性能测量
+    """
+
+    def __init__(self, time_source, duration_of=None):
+        self.time_source = time_source
+        self.duration_of = duration_of or (lambda path: None)
+        self.initialized = False
+        self.volume = 1.0
+        self.current = None
+        self.queued = None
+        self.playing = False
+        self.paused = False
+        # 当前一段播放开始时的时间, 开始位置和已累计的播放时间
+        self.started = 0.0
+        self.start_pos = 0.0
+        self.elapsed = 0.0
+
+        # 调用次数, 测试中用来确认没有多余的跳转或重新加载
+        self.loads = 0
+        self.plays = 0
+
+    def _require(self):
+        if not self.initialized:
+            raise AudioError("mixer not initialized")
+
+    def _played(self):
+        if self.paused:
+            return self.elapsed
+        return self.elapsed + self.time_source() - self.started
+
+    def _update(self):
+        """播放到结尾时切换到队列中的下一首或停止"""
+        while self.playing:
+            duration = self.duration_of(self.current)
+            if duration is None:
+                return
+            remaining = duration - self.start_pos - self._played()
+            if remaining > 0:
+                return
+            if self.queued is None:
+                self.playing = False
+                return
+            # 下一首从边界时刻开始计时, 从结尾之后开始播放时立即切换
+            boundary = max(self.started, self.time_source() + remaining)
+            self.current, self.queued = self.queued, None
+            self.start_pos = 0.0
+            self.elapsed = 0.0
+            self.started = boundary
+            self.paused = False
+
+    def init(self):
+        self.initialized = True
+
+    def quit(self):
+        self.initialized = False
+        self.playing = False
+
+    def load(self, path):
+        self._require()
+        self.current = path
+        self.queued = None
+        self.playing = False
+        self.loads += 1
+
+    def play(self, start=0.0):
+        self._require()
+        if self.current is None:
+            raise AudioError("music not loaded")
+        self.playing = True
+        self.paused = False
+        self.start_pos = start
+        self.elapsed = 0.0
+        self.started = self.time_source()
+        self.plays += 1
+
+    def queue(self, path):
+        self._require()
+        if self.current is None:
+            raise AudioError("music not loaded")
+        self.queued = path
+
+    def stop(self):
+        self._require()
+        self.playing = False
+        self.queued = None
+
+    def pause(self):
+        self._update()
+        if self.playing and not self.paused:
+            self.elapsed = self._played()
+            self.paused = True
+
+    def unpause(self):
+        if self.playing and self.paused:
+            self.started = self.time_source()
+            self.paused = False
+
+    def set_volume(self, volume):
+        self.volume = volume
+
+    def get_pos(self):
+        self._update()
+        if not self.playing:
+            return -1
+        return int(self._played() * 1000)
+
+    def get_busy(self):
+        self._update()
+        return self.playing and not self.paused
@@ -0,0 +1,129 @@
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from lrc_srt_convert import convert
+from vtt2srt import vtt_to_srt
+
+# 支持的转换: (源后缀, 目标后缀) -> 转换函数(src, dst)
+CONVERTERS = {
+    ('.vtt', '.srt'): vtt_to_srt,
+    ('.srt', '.lrc'): convert,
+    ('.lrc', '.srt'): convert,
+}
+
+
+def scan_files(directory, ext, recursive=False):
+    """用 os.scandir 查找目录下指定后缀的文件, 生成 (路径, DirEntry)"""
+    try:
+        entries = os.scandir(directory)
+    except OSError as e:
+        print(f"无法读取目录 {directory}: {e}")
+        return
+    with entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                if recursive:
+                    yield from scan_files(entry.path, ext, recursive)
+            elif entry.is_file() and entry.name.lower().endswith(ext):
+                yield entry.path, entry
+
+
+def target_path(src, dst_ext):
+    return os.path.splitext(src)[0] + dst_ext
+
+
+def is_up_to_date(entry, dst):
+    """目标文件存在且不比源文件旧时跳过"""
+    try:
+        return os.stat(dst).st_mtime >= entry.stat().st_mtime
+    except OSError:
+        return False
+
+
+def convert_one(job):
+    """在工作进程中转换单个文件, 返回 (源路径, 错误信息)"""
+    src, dst, src_ext, dst_ext = job
+    try:
+        CONVERTERS[(src_ext, dst_ext)](src, dst)
+        return src, None
+    except Exception as e:
+        return src, f"{type(e).__name__}: {e}"
+
+
+def batch_convert(directory, src_ext='.vtt', dst_ext='.srt', recursive=False,
+                  force=False, workers=None):
+    """批量转换目录下的字幕文件, 返回统计信息"""
+    if (src_ext, dst_ext) not in CONVERTERS:
+        raise ValueError(f"不支持的转换: {src_ext} -> {dst_ext}")
+
+    start = time.perf_counter()
+    jobs = []
+    sizes = {}
+    skipped = 0
+    failed = 0
+    for src, entry in scan_files(directory, src_ext, recursive):
+        dst = target_path(src, dst_ext)
+        if os.path.abspath(dst) == os.path.abspath(src):
+            # 转换器边读边写, 写入源文件会把它清空
+            failed += 1
+            print(f"跳过 {src}: 目标文件与源文件相同")
+            continue
+        if not force and is_up_to_date(entry, dst):
+            skipped += 1
+            continue
+        jobs.append((src, dst, src_ext, dst_ext))
+        sizes[src] = entry.stat().st_size
+
+    converted = 0
+    total_bytes = 0
+    if jobs:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            chunksize = max(1, len(jobs) // ((workers or os.cpu_count() or 1) * 4))
+            for src, error in executor.map(convert_one, jobs, chunksize=chunksize):
+                if error:
+                    failed += 1
+                    print(f"转换失败 {src}: {error}")
+                else:
+                    converted += 1
+                    total_bytes += sizes[src]
+
+    elapsed = time.perf_counter() - start
+    return {
+        "converted": converted,
+        "skipped": skipped,
+        "failed": failed,
+        "bytes": total_bytes,
+        "seconds": elapsed,
+        "files_per_second": converted / elapsed if elapsed else 0.0,
+        "mb_per_second": total_bytes / 1048576 / elapsed if elapsed else 0.0,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="批量转换 vtt/srt/lrc 字幕文件")
+    parser.add_argument("directory", help="字幕文件所在目录")
+    parser.add_argument("-f", "--from", dest="src", default="vtt", choices=["vtt", "srt", "lrc"],
+                        help="源格式 (默认 vtt)")
+    parser.add_argument("-t", "--to", dest="dst", default="srt", choices=["srt", "lrc"],
+                        help="目标格式 (默认 srt)")
+    parser.add_argument("-r", "--recursive", action="store_true", help="递归处理子目录")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="工作进程数 (默认 CPU 核数)")
+    parser.add_argument("--force", action="store_true", help="即使目标文件较新也重新转换")
+    args = parser.parse_args(argv)
+
+    try:
+        stats = batch_convert(args.directory, '.' + args.src, '.' + args.dst,
+                              args.recursive, args.force, args.jobs)
+    except ValueError as e:
+        parser.error(str(e))
+
+    print(f"转换 {stats['converted']} 个, 跳过 {stats['skipped']} 个, 失败 {stats['failed']} 个, "
+          f"用时 {stats['seconds']:.2f}s, "
+          f"{stats['files_per_second']:.1f} files/s, {stats['mb_per_second']:.2f} MB/s")
+    return 1 if stats['failed'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,10 +1,49 @@
+import atexit
 import json
 import os
 import sys
+import tempfile
+import threading
+import time
+from instrumentation import get_instrumentation
+
+# 最后一次修改后等待多久再写入配置文件(秒)
+SAVE_DELAY = 0.5
+
+
+def get_cache_dir():
+    """返回用户缓存目录, 不存在时自动创建"""
+    if sys.platform == 'win32':
+        base = os.environ.get('LOCALAPPDATA') or os.path.expanduser('~')
+    else:
+        base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    cache_dir = os.path.join(base, 'lrc_player')
+    os.makedirs(cache_dir, exist_ok=True)
+    return cache_dir
+
 
 class ConfigManager:
-    def __init__(self):
-        self.config_path = self._get_config_path()
+    """程序中唯一的配置存储
+
+    配置只读取一次并保存在内存中, 各窗口共享同一个字典。
+    save_config 只登记一次保存, 由后台线程在 delay 秒内没有新的保存时
+    写入临时文件再替换 config.json, 拖动窗口时只写一次文件;
+    退出时 flush 立即写入尚未保存的修改
+    """
+
+    def __init__(self, config_path=None, delay=SAVE_DELAY):
+        self.config_path = config_path or self._get_config_path()
+        self.delay = delay
+        self.config = None
+        self.writes = 0
+
+        # 等待写入的 JSON 文本和写入时间
+        self.pending = None
+        self.deadline = 0.0
+        self.condition = threading.Condition()
+        # 保证同一时刻只有一个线程写文件, 且后登记的内容后写入
+        self.write_lock = threading.Lock()
+        self.writer = None
         
     def _get_config_path(self):
         if getattr(sys, 'frozen', False):
@@ -12,13 +51,77 @@ class ConfigManager:
         return os.path.join(os.path.dirname(os.path.realpath(__file__)), 'config.json')
     
     def load_config(self):
-        try:
-            with open(self.config_path, 'r') as f:
-                return json.load(f)
-        except FileNotFoundError:
-            print(f"Error: {self.config_path} not found!")
-            return None
+        """返回内存中的配置, 第一次调用时从文件读取"""
+        if self.config is None:
+            try:
+                with open(self.config_path, 'r') as f:
+                    self.config = json.load(f)
+            except FileNotFoundError:
+                print(f"Error: {self.config_path} not found!")
+                return None
+        return self.config
             
-    def save_config(self, config):
-        with open(self.config_path, 'w') as f:
-            json.dump(config, f, indent=4) 
\ No newline at end of file
+    def save_config(self, config=None):
+        """登记一次保存, 稍后由后台线程写入文件"""
+        if config is not None:
+            self.config = config
+        # 在调用线程中序列化, 后台线程不会读到修改了一半的字典
+        with get_instrumentation().timer("config_save"):
+            data = json.dumps(self.config, indent=4)
+        with self.condition:
+            self.pending = data
+            self.deadline = time.monotonic() + self.delay
+            if self.writer is None:
+                self.writer = threading.Thread(target=self._run, daemon=True)
+                self.writer.start()
+            self.condition.notify()
+
+    def flush(self):
+        """立即写入尚未保存的修改"""
+        with self.write_lock:
+            with self.condition:
+                data = self.pending
+                self.pending = None
+            if data is not None:
+                with get_instrumentation().timer("config_write"):
+                    self._write(data)
+
+    def _run(self):
+        while True:
+            with self.condition:
+                while True:
+                    if self.pending is None:
+                        self.condition.wait()
+                        continue
+                    remaining = self.deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self.condition.wait(remaining)
+            self.flush()
+
+    def _write(self, data):
+        directory = os.path.dirname(self.config_path) or '.'
+        try:
+            fd, temp_path = tempfile.mkstemp(prefix='.config-', suffix='.tmp', dir=directory)
+            try:
+                with os.fdopen(fd, 'w') as f:
+                    f.write(data)
+                os.replace(temp_path, self.config_path)
+            except BaseException:
+                os.unlink(temp_path)
+                raise
+            self.writes += 1
+        except OSError as e:
+            print(f"保存配置失败: {e}")
+
+
+_config_manager = None
+
+
+def get_config_manager():
+    """返回全局共享的配置存储, 程序退出时自动写入未保存的修改"""
+    global _config_manager
+    if _config_manager is None:
+        _config_manager = ConfigManager()
+        atexit.register(_config_manager.flush)
+    return _config_manager
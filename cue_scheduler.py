@@ -0,0 +1,43 @@
+import math
+
+
+class CueScheduler:
+    """基于 Tk after 的单次定时器
+
+    根据播放时间计算到目标时刻的延迟, 只挂一个 after,
+    重新安排时会先取消之前的定时器, 避免固定间隔轮询
+    """
+
+    def __init__(self, widget, get_time, callback, min_delay=1):
+        self.widget = widget
+        self.get_time = get_time
+        self.callback = callback
+        self.min_delay = min_delay
+        self.job = None
+        self.target_time = None
+
+    def schedule_at(self, target_time):
+        """在播放时间到达 target_time(秒) 时触发回调"""
+        delay = math.ceil((target_time - self.get_time()) * 1000)
+        self.target_time = target_time
+        self._arm(delay)
+
+    def schedule_in(self, delay_ms):
+        """在 delay_ms 毫秒后触发回调"""
+        self.target_time = None
+        self._arm(delay_ms)
+
+    def cancel(self):
+        if self.job is not None:
+            self.widget.after_cancel(self.job)
+            self.job = None
+        self.target_time = None
+
+    def _arm(self, delay):
+        if self.job is not None:
+            self.widget.after_cancel(self.job)
+        self.job = self.widget.after(max(self.min_delay, int(delay)), self._fire)
+
+    def _fire(self):
+        self.job = None
+        self.callback()
@@ -0,0 +1,130 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from instrumentation import get_instrumentation
+from media_index import MediaIndex
+from media_probe import AUDIO_EXTENSIONS, probe_duration
+from subtitle_loader import SUBTITLE_EXTENSIONS, find_subtitle
+
+# 每批最多返回的曲目数, 以及凑不满一批时的最长等待时间(秒)
+BATCH_SIZE = 50
+BATCH_INTERVAL = 0.1
+
+
+def list_subtitles(folder_path):
+    """文件夹和其中 lyrics 子目录下的字幕路径集合(经过 normcase), 与 find_subtitle 拼出的路径一致"""
+    paths = set()
+    for directory in (folder_path, os.path.join(folder_path, 'lyrics')):
+        try:
+            with os.scandir(directory) as it:
+                paths.update(os.path.normcase(entry.path) for entry in it
+                             if entry.name.lower().endswith(SUBTITLE_EXTENSIONS))
+        except OSError:
+            continue  # 没有 lyrics 子目录
+    return paths
+
+
+class FolderScanner:
+    """在后台线程中扫描文件夹并读取音乐信息
+
+    索引中未变化的文件直接复用, 其余文件交给线程池读取时长,
+    结果按目录顺序分批放入线程安全的队列, 由主线程用 after 取出。
+    队列中的消息:
+        ("total", 曲目数)
+        ("tracks", [(路径, 显示名称, 时长, 字幕路径), ...])
+        ("done", None)
+    """
+
+    def __init__(self, folder_path, workers=None):
+        self.folder_path = folder_path
+        self.workers = workers or min(8, (os.cpu_count() or 1) + 2)
+        self.queue = queue.Queue()
+        self.cancelled = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def cancel(self):
+        """取消扫描, 未开始的读取任务不再执行"""
+        self.cancelled.set()
+
+    def run(self):
+        # sqlite 连接只能在创建它的线程中使用
+        media_index = MediaIndex()
+        stats = get_instrumentation()
+        scan_start = time.perf_counter()
+        updates = []
+        try:
+            indexed = media_index.lookup_folder(self.folder_path)
+            entries = []
+            with os.scandir(self.folder_path) as it:
+                for entry in it:
+                    if entry.name.lower().endswith(AUDIO_EXTENSIONS):
+                        st = entry.stat()
+                        entries.append((entry.path, entry.name, st.st_size, st.st_mtime_ns))
+            self.queue.put(("total", len(entries)))
+            # 字幕可能在音乐文件之后才添加, 每次扫描都重新查找, 只查目录列表
+            subtitles = list_subtitles(self.folder_path)
+
+            def subtitle_exists(path):
+                return os.path.normcase(path) in subtitles
+
+            def resolve(item):
+                path, name, size, mtime_ns = item
+                info = indexed.get(path)
+                if info and info[0] == size and info[1] == mtime_ns:
+                    subtitle_path = find_subtitle(path, subtitle_exists)
+                    update = None
+                    if subtitle_path != info[4]:
+                        update = (path, size, mtime_ns, info[2], info[3], subtitle_path)
+                    return path, info[3], info[2], subtitle_path, update
+                if self.cancelled.is_set():
+                    return None
+                try:
+                    # 只读取文件头, 内存占用与文件大小无关
+                    with stats.timer("probe"):
+                        duration = probe_duration(path)
+                except (OSError, ValueError) as e:
+                    print(f"无法读取 {path} 的时长: {e}")
+                    duration = 0.0
+                # 去掉文件后缀显示
+                display_name = os.path.splitext(name)[0]
+                subtitle_path = find_subtitle(path, subtitle_exists)
+                return path, display_name, duration, subtitle_path, (
+                    path, size, mtime_ns, duration, display_name, subtitle_path)
+
+            batch = []
+            last_flush = time.monotonic()
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                for result in executor.map(resolve, entries):
+                    if self.cancelled.is_set():
+                        executor.shutdown(wait=False, cancel_futures=True)
+                        break
+                    if result is None:
+                        continue
+                    path, display_name, duration, subtitle_path, update = result
+                    if update:
+                        updates.append(update)
+                    batch.append((path, display_name, duration, subtitle_path))
+                    now = time.monotonic()
+                    if len(batch) >= BATCH_SIZE or now - last_flush >= BATCH_INTERVAL:
+                        self.queue.put(("tracks", batch))
+                        batch = []
+                        last_flush = now
+            if batch and not self.cancelled.is_set():
+                self.queue.put(("tracks", batch))
+
+            # 更新索引, 完整扫描后删除已不存在的文件
+            media_index.update(updates)
+            if not self.cancelled.is_set():
+                seen = {entry[0] for entry in entries}
+                media_index.remove([path for path in indexed if path not in seen])
+        except Exception as e:
+            print(f"扫描文件夹失败: {e}")
+        finally:
+            stats.record("folder_scan", (time.perf_counter() - scan_start) * 1000)
+            media_index.close()
+            self.queue.put(("done", None))
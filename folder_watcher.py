@@ -0,0 +1,289 @@
+import ctypes
+import ctypes.util
+import os
+import queue
+import select
+import struct
+import sys
+import threading
+import time
+from instrumentation import get_instrumentation
+from media_index import MediaIndex
+from media_probe import AUDIO_EXTENSIONS, probe_duration
+from subtitle_loader import find_subtitle
+
+# 文件最后一次变化之后等多久再读取(秒), 避免读到下载到一半的文件
+SETTLE_SECONDS = 1.0
+# 没有 inotify 时两次扫描目录的间隔(秒)
+POLL_INTERVAL = 2.0
+# inotify 等待事件的最长时间(秒), 到时检查是否已取消
+WAIT_TIMEOUT = 1.0
+
+# inotify 常量, 见 <sys/inotify.h>
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+_WATCH_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO
+               | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF)
+# struct inotify_event 的固定部分: wd, mask, cookie, len
+_EVENT = struct.Struct('iIII')
+
+
+class InotifyBackend:
+    """用 Linux inotify 监视目录, 通过 ctypes 调用 libc, 不需要第三方库"""
+
+    def __init__(self, folder_path):
+        libc_name = ctypes.util.find_library('c') or 'libc.so.6'
+        libc = ctypes.CDLL(libc_name, use_errno=True)
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+        if libc.inotify_add_watch(self.fd, os.fsencode(folder_path), _WATCH_MASK) < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, os.strerror(errno), folder_path)
+        self.gone = False
+
+    def wait(self, timeout):
+        """等待事件, 返回有变化的文件名集合; 事件队列溢出时返回 None, 需要重新扫描"""
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return set()
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return set()
+        names = set()
+        offset = 0
+        while offset + _EVENT.size <= len(data):
+            wd, mask, cookie, length = _EVENT.unpack_from(data, offset)
+            offset += _EVENT.size
+            name = data[offset:offset + length].rstrip(b'\0')
+            offset += length
+            if mask & IN_Q_OVERFLOW:
+                return None
+            if mask & (IN_DELETE_SELF | IN_MOVE_SELF | IN_IGNORED):
+                self.gone = True
+            if name:
+                names.add(os.fsdecode(name))
+        return names
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingBackend:
+    """定期扫描目录并比较大小、修改时间和 inode, 用于没有 inotify 的平台"""
+
+    def __init__(self, folder_path, stopped, interval=POLL_INTERVAL):
+        self.folder_path = folder_path
+        self.stopped = stopped
+        self.interval = interval
+        self.gone = False
+        self.snapshot = self.scan()
+
+    def scan(self):
+        snapshot = {}
+        try:
+            with os.scandir(self.folder_path) as it:
+                for entry in it:
+                    if entry.name.lower().endswith(AUDIO_EXTENSIONS):
+                        try:
+                            st = entry.stat()
+                        except OSError:
+                            continue
+                        snapshot[entry.name] = (st.st_size, st.st_mtime_ns, st.st_ino)
+        except FileNotFoundError:
+            self.gone = True
+        return snapshot
+
+    def wait(self, timeout):
+        self.stopped.wait(self.interval)
+        current = self.scan()
+        previous = self.snapshot
+        self.snapshot = current
+        return {name for name in current.keys() | previous.keys() if current.get(name) != previous.get(name)}
+
+    def close(self):
+        pass
+
+
+class FolderWatcher:
+    """在后台线程中监视已打开的文件夹, 只报告增加、删除和改名的音乐文件
+
+    Linux 上使用 inotify, 其他平台或 inotify 不可用时定期扫描比较。
+    known_paths 是播放列表中已有的文件, 启动时先与目录比较一次,
+    补上扫描期间的变化。文件停止变化 SETTLE_SECONDS 秒后才处理,
+    新文件在这个线程中读取时长, 改名(同一 inode)的文件不重新读取。
+    队列中的消息:
+        ("tracks", [(路径, 显示名称, 时长, 字幕路径), ...])   新增或内容变化
+        ("removed", [路径, ...])
+        ("renamed", [(旧路径, 新路径, 显示名称, 字幕路径), ...])
+    """
+
+    def __init__(self, folder_path, known_paths=(), poll_interval=POLL_INTERVAL):
+        self.folder_path = folder_path
+        self.known_paths = list(known_paths)
+        self.poll_interval = poll_interval
+        self.queue = queue.Queue()
+        self.cancelled = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        # 文件名 -> (大小, 修改时间, inode)
+        self.known = {}
+
+    def start(self):
+        self.thread.start()
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def create_backend(self):
+        if sys.platform.startswith('linux'):
+            try:
+                return InotifyBackend(self.folder_path)
+            except (OSError, AttributeError) as e:
+                # 没有 libc 的 inotify 函数或超出 max_user_watches
+                print(f"inotify 不可用, 改为定期扫描: {e}")
+        return PollingBackend(self.folder_path, self.cancelled, self.poll_interval)
+
+    def list_names(self):
+        try:
+            return {name for name in os.listdir(self.folder_path)
+                    if name.lower().endswith(AUDIO_EXTENSIONS)}
+        except OSError:
+            return set()
+
+    def run(self):
+        # sqlite 连接只能在创建它的线程中使用
+        media_index = MediaIndex()
+        backend = None
+        try:
+            # 先开始监视再与播放列表比较, 比较期间的变化也不会漏掉
+            backend = self.create_backend()
+            for path in self.known_paths:
+                name = os.path.basename(path)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    st = None
+                # 已不存在的文件也先记下, 由第一次比较报告删除
+                self.known[name] = (st.st_size, st.st_mtime_ns, st.st_ino) if st else (None, None, None)
+            pending = dict.fromkeys(self.list_names() | self.known.keys(), 0.0)
+
+            while not self.cancelled.is_set():
+                now = time.monotonic()
+                due = [name for name, changed in pending.items() if now - changed >= SETTLE_SECONDS]
+                if due:
+                    for name in due:
+                        del pending[name]
+                    self.apply(due, media_index)
+                if backend.gone:
+                    break
+
+                timeout = WAIT_TIMEOUT
+                if pending:
+                    timeout = max(0.05, min(timeout, SETTLE_SECONDS - (now - min(pending.values()))))
+                names = backend.wait(timeout)
+                if names is None:
+                    names = self.list_names() | self.known.keys()
+                now = time.monotonic()
+                for name in names:
+                    if name in self.known or name.lower().endswith(AUDIO_EXTENSIONS):
+                        pending[name] = now
+        except Exception as e:
+            print(f"监视文件夹失败: {e}")
+        finally:
+            if backend is not None:
+                backend.close()
+            media_index.close()
+
+    def apply(self, names, media_index):
+        """比较文件当前的状态和记录的状态, 把变化放入队列"""
+        added = {}
+        removed = {}
+        for name in names:
+            path = os.path.join(self.folder_path, name)
+            try:
+                st = os.stat(path)
+                exists = name.lower().endswith(AUDIO_EXTENSIONS) and not os.path.isdir(path)
+            except OSError:
+                exists = False
+            old = self.known.get(name)
+            if not exists:
+                if old is not None:
+                    removed[name] = old
+                    del self.known[name]
+                continue
+            state = (st.st_size, st.st_mtime_ns, st.st_ino)
+            if old == state:
+                continue
+            self.known[name] = state
+            added[name] = state
+
+        # 同一 inode 先删除后出现, 说明是改名
+        removed_inodes = {state[2]: name for name, state in removed.items() if state[2]}
+        renamed = []
+        index_updates = []
+        for name, state in list(added.items()):
+            old_name = removed_inodes.pop(state[2], None) if state[2] else None
+            if old_name is None:
+                continue
+            del added[name]
+            del removed[old_name]
+            old_path = os.path.join(self.folder_path, old_name)
+            path = os.path.join(self.folder_path, name)
+            display_name = os.path.splitext(name)[0]
+            subtitle_path = find_subtitle(path)
+            renamed.append((old_path, path, display_name, subtitle_path))
+            info = media_index.lookup(old_path, state[0], state[1])
+            if info:
+                index_updates.append((path, state[0], state[1], info[0], display_name, subtitle_path))
+
+        if removed:
+            self.queue.put(("removed", [os.path.join(self.folder_path, name) for name in removed]))
+        if renamed:
+            self.queue.put(("renamed", renamed))
+            media_index.remove([item[0] for item in renamed])
+        if removed:
+            media_index.remove([os.path.join(self.folder_path, name) for name in removed])
+
+        tracks = []
+        stats = get_instrumentation()
+        for name, (size, mtime_ns, ino) in sorted(added.items()):
+            if self.cancelled.is_set():
+                return
+            path = os.path.join(self.folder_path, name)
+            info = media_index.lookup(path, size, mtime_ns)
+            if info:
+                # 字幕可能在索引之后才添加, 重新查找
+                subtitle_path = find_subtitle(path)
+                tracks.append((path, info[1], info[0], subtitle_path))
+                if subtitle_path != info[2]:
+                    index_updates.append((path, size, mtime_ns, info[0], info[1], subtitle_path))
+                continue
+            try:
+                with stats.timer("probe"):
+                    duration = probe_duration(path)
+            except (OSError, ValueError) as e:
+                print(f"无法读取 {path} 的时长: {e}")
+                duration = 0.0
+            display_name = os.path.splitext(name)[0]
+            subtitle_path = find_subtitle(path)
+            tracks.append((path, display_name, duration, subtitle_path))
+            index_updates.append((path, size, mtime_ns, duration, display_name, subtitle_path))
+        if tracks:
+            self.queue.put(("tracks", tracks))
+        if index_updates:
+            media_index.update(index_updates)
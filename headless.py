@@ -0,0 +1,286 @@
+import argparse
+import heapq
+import itertools
+import json
+import random
+import statistics
+import sys
+import time
+from audio_backend import NullAudioBackend
+from instrumentation import Instrumentation
+from lyric_timeline import LyricTimeline
+from playback_engine import PlaybackEngine
+from view_model import ViewModel
+
+
+class VirtualClock:
+    """手动推进的时钟, 可以替代 time.perf_counter 作为时间来源"""
+
+    def __init__(self, start=0.0):
+        self.time = start
+
+    def __call__(self):
+        return self.time
+
+    def advance(self, seconds):
+        self.time += seconds
+
+
+class VirtualLoop:
+    """用虚拟时钟驱动的事件循环, 提供与 Tk 控件相同的 after 接口
+
+    run_until 按到期时间依次执行定时器, 并把时钟拨到定时器的到期时间,
+    几小时的播放可以在几毫秒到几秒内模拟完
+    """
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.heap = []
+        self.jobs = {}
+        self.counter = itertools.count()
+        self.callbacks = 0
+
+    def after(self, ms, func, *args):
+        seq = next(self.counter)
+        job = f"after#{seq}"
+        self.jobs[job] = (func, args)
+        heapq.heappush(self.heap, (self.clock() + ms / 1000.0, seq, job))
+        return job
+
+    def after_idle(self, func, *args):
+        return self.after(0, func, *args)
+
+    def after_cancel(self, job):
+        self.jobs.pop(job, None)
+
+    def run_until(self, end_time):
+        """执行 end_time 之前到期的全部定时器"""
+        while self.heap and self.heap[0][0] <= end_time:
+            due, seq, job = heapq.heappop(self.heap)
+            callback = self.jobs.pop(job, None)
+            if callback is None:
+                continue
+            if due > self.clock.time:
+                self.clock.time = due
+            func, args = callback
+            self.callbacks += 1
+            func(*args)
+        if end_time > self.clock.time:
+            self.clock.time = end_time
+
+    def run_for(self, seconds):
+        self.run_until(self.clock() + seconds)
+
+
+class RecordingTarget:
+    """代替 Tk 标签, 记录每次更新的时间和内容"""
+
+    def __init__(self, on_update=None):
+        self.on_update = on_update
+        self.updates = 0
+        self.value = None
+
+    def configure(self, **options):
+        self.updates += 1
+        self.value = options.get("text")
+        if self.on_update:
+            self.on_update(self.value)
+
+
+class HeadlessPlayer:
+    """无界面、无声卡的播放器, 用虚拟时钟和 NullAudioBackend 驱动 PlaybackEngine
+
+    tracks 是 [(音乐名, LyricTimeline, 时长秒), ...], 按顺序无缝播放。
+    记录每句歌词显示时相对歌词时间点的延迟
+    """
+
+    def __init__(self, tracks, threaded_preload=False):
+        self.tracks = tracks
+        self.index = 0
+        self.finished = False
+        self.by_name = {name: (lyrics, duration) for name, lyrics, duration in tracks}
+        self.cue_times = {}
+        self.last_cue = -1
+        self.last_action = None
+        self.latencies = []
+        # 字幕加载次数和无缝切换记录 [(虚拟时间, 音乐名), ...]
+        self.lyric_loads = 0
+        self.switches = []
+
+        self.clock = VirtualClock()
+        self.loop = VirtualLoop(self.clock)
+        self.audio = NullAudioBackend(self.clock, self.get_track_duration)
+        self.stats = Instrumentation(enabled=True)
+        self.view = ViewModel(self.loop)
+        self.lyric_target = RecordingTarget(self.on_lyric_rendered)
+        self.time_target = RecordingTarget()
+        self.view.bind("lyric", self.lyric_target)
+        self.view.bind("time", self.time_target)
+        self.engine = PlaybackEngine(self.loop, self.audio, self, self.view, self.stats,
+                                     time_source=self.clock, threaded_preload=threaded_preload)
+
+    # PlaybackEngine 的 host 接口
+    def load_lyrics(self, name):
+        self.lyric_loads += 1
+        return self.by_name[name][0]
+
+    def find_subtitle(self, name):
+        return name if name in self.by_name else None
+
+    def get_track_duration(self, name):
+        return self.by_name[name][1]
+
+    def get_next_track(self):
+        if self.index + 1 >= len(self.tracks):
+            return None
+        name = self.tracks[self.index + 1][0]
+        return name, name
+
+    def on_track_switched(self, name):
+        self.switches.append((self.clock(), name))
+        self.index += 1
+        self._index_cues()
+
+    def on_track_finished(self):
+        if self.index + 1 < len(self.tracks):
+            self.index += 1
+            self.play_current()
+        else:
+            self.finished = True
+            self.engine.stop()
+
+    def play_current(self):
+        name, lyrics, duration = self.tracks[self.index]
+        self.engine.load_track(name, lyrics)
+        self._index_cues()
+
+    def _index_cues(self):
+        lyrics = self.engine.lyrics
+        self.cue_times = {lyrics.texts[i]: (i, lyrics.times[i]) for i in range(len(lyrics))}
+        self.last_cue = -1
+
+    def on_lyric_rendered(self, text):
+        cue = self.cue_times.get(text)
+        if cue is None:
+            return
+        index, cue_time = cue
+        # 只统计按时间顺序到达的歌词, 跳转或继续播放时显示的歌词不算延迟
+        if (index == self.last_cue + 1 and not self.engine.is_paused
+                and self.clock() != self.last_action):
+            self.latencies.append(self.engine.clock.now() - cue_time)
+        self.last_cue = index
+
+    def run(self, script=(), until=None):
+        """播放并按 script 执行操作, script 为 [(虚拟时间秒, 操作, 参数), ...]
+
+        操作: "seek"(参数为秒数), "pause", "resume"
+        """
+        self.play_current()
+        for at, action, arg in sorted(script, key=lambda item: item[0]):
+            if self.finished or (until is not None and at > until):
+                break
+            self.loop.run_until(at)
+            if action == "seek":
+                self.engine.seek_by(arg)
+            elif action in ("pause", "resume") and self.engine.is_paused == (action == "resume"):
+                self.engine.toggle_pause()
+            self.last_action = self.clock()
+        self.run_until_finished(until)
+
+    def run_until_finished(self, until=None):
+        """执行定时器直到播放完最后一首或到达 until 秒"""
+        end = until if until is not None else float("inf")
+        while not self.finished and self.loop.heap and self.clock() < end:
+            self.loop.run_until(min(end, self.loop.heap[0][0]))
+
+
+def synthetic_tracks(count, seed=1, min_duration=180, max_duration=300):
+    """生成 count 首虚拟歌曲, 每 2~5 秒一句歌词"""
+    rng = random.Random(seed)
+    tracks = []
+    for n in range(count):
+        duration = rng.uniform(min_duration, max_duration)
+        pairs = []
+        t = rng.uniform(0, 5)
+        while t < duration - 1:
+            pairs.append((t, f"track {n} line {len(pairs)}"))
+            t += rng.uniform(2, 5)
+        tracks.append((f"track{n}.mp3", LyricTimeline.from_pairs(pairs), duration))
+    return tracks
+
+
+def synthetic_script(total_seconds, seeks, seed=1):
+    """生成跳转和暂停脚本, 部分跳转连续按键以测试合并"""
+    rng = random.Random(seed)
+    script = []
+    for _ in range(seeks):
+        at = rng.uniform(0, total_seconds)
+        delta = rng.choice((-30.0, -5.0, 5.0, 30.0))
+        for k in range(rng.choice((1, 1, 1, 5))):
+            script.append((at + k * 0.03, "seek", delta))
+    for _ in range(max(1, seeks // 10)):
+        at = rng.uniform(0, total_seconds)
+        script.append((at, "pause", None))
+        script.append((at + rng.uniform(1, 10), "resume", None))
+    return script
+
+
+def simulate(hours=3.0, seeks=200, seed=1):
+    """模拟 hours 小时的播放, 返回延迟和 CPU 开销统计"""
+    tracks = synthetic_tracks(int(hours * 3600 / 180) + 1, seed)
+    total = sum(track[2] for track in tracks)
+    player = HeadlessPlayer(tracks)
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    player.run(synthetic_script(total, seeks, seed), until=hours * 3600)
+    cpu = time.process_time() - cpu_start
+    wall = time.perf_counter() - wall_start
+
+    latencies = sorted(ms * 1000 for ms in player.latencies)
+    return {
+        "simulated_seconds": round(player.clock(), 1),
+        "tracks_played": player.index + 1,
+        "cues_rendered": len(latencies),
+        "cue_latency_ms": {
+            "p50": round(statistics.median(latencies), 3) if latencies else 0.0,
+            "p99": round(latencies[int(len(latencies) * 0.99)], 3) if latencies else 0.0,
+            "max": round(latencies[-1], 3) if latencies else 0.0,
+        },
+        "track_switches": len(player.switches),
+        "lyric_loads": player.lyric_loads,
+        "callbacks": player.loop.callbacks,
+        "widget_updates": player.lyric_target.updates + player.time_target.updates,
+        "audio_plays": player.audio.plays,
+        "audio_loads": player.audio.loads,
+        "cpu_seconds": round(cpu, 3),
+        "wall_seconds": round(wall, 3),
+        "speedup": round(player.clock() / wall, 1) if wall else None,
+        "metrics": player.stats.snapshot(),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="用虚拟时钟模拟长时间播放, 测量歌词显示延迟和 CPU 开销")
+    parser.add_argument("--hours", type=float, default=3.0, help="模拟播放时长(小时, 默认 3)")
+    parser.add_argument("--seeks", type=int, default=200, help="随机跳转次数 (默认 200)")
+    parser.add_argument("--seed", type=int, default=1, help="随机种子")
+    parser.add_argument("-o", "--output", help="把结果保存为 JSON 文件")
+    args = parser.parse_args(argv)
+
+    report = simulate(args.hours, args.seeks, args.seed)
+    print(f"模拟 {report['simulated_seconds']:.0f}s, {report['tracks_played']} 首, "
+          f"{report['cues_rendered']} 句歌词, 用时 {report['wall_seconds']:.2f}s "
+          f"(CPU {report['cpu_seconds']:.2f}s, {report['speedup']}x)")
+    latency = report["cue_latency_ms"]
+    print(f"歌词显示延迟: p50 {latency['p50']:.2f} ms, p99 {latency['p99']:.2f} ms, max {latency['max']:.2f} ms")
+    print(f"定时器回调 {report['callbacks']} 次, 控件更新 {report['widget_updates']} 次, "
+          f"音频跳转 {report['audio_plays']} 次, 重新加载 {report['audio_loads']} 次")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=4, ensure_ascii=False)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
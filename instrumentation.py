@@ -0,0 +1,165 @@
+import atexit
+import json
+import os
+import threading
+import time
+from collections import deque
+
+# 设置此环境变量可以不修改配置文件启用统计, 值为 .json 路径时统计保存到该文件
+ENV_VAR = "LRC_PLAYER_STATS"
+
+# 每项统计保留的最近样本数
+WINDOW = 1000
+
+
+class Metric:
+    """一项耗时统计, 保留最近 WINDOW 个样本计算百分位数(毫秒)"""
+
+    def __init__(self, window=WINDOW):
+        self.samples = deque(maxlen=window)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, ms):
+        self.samples.append(ms)
+        self.count += 1
+        self.total += ms
+        self.max = max(self.max, ms)
+
+    def percentile(self, p, ordered=None):
+        ordered = ordered or sorted(self.samples)
+        if not ordered:
+            return 0.0
+        return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+    def summary(self):
+        ordered = sorted(self.samples)
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total / self.count, 3) if self.count else 0.0,
+            "p50_ms": round(self.percentile(50, ordered), 3),
+            "p90_ms": round(self.percentile(90, ordered), 3),
+            "p99_ms": round(self.percentile(99, ordered), 3),
+            "max_ms": round(self.max, 3),
+        }
+
+
+class _Timer:
+    __slots__ = ("stats", "name", "start")
+
+    def __init__(self, stats, name):
+        self.stats = stats
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.stats.record(self.name, (time.perf_counter() - self.start) * 1000)
+        return False
+
+
+class _NullTimer:
+    """未启用统计时使用, 不做任何事"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class Instrumentation:
+    """热点路径的耗时统计
+
+    默认关闭, 关闭时 timer 返回空的上下文管理器, record 直接返回。
+    可以在多个线程中记录(后台扫描和配置写入不在主线程)
+    """
+
+    def __init__(self, enabled=False, dump_path=None):
+        self.enabled = enabled
+        self.dump_path = dump_path
+        self.metrics = {}
+        self.lock = threading.Lock()
+        self.started = time.time()
+
+    def timer(self, name):
+        """用 with 统计一段代码的耗时"""
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, name)
+
+    def record(self, name, ms):
+        """记录一个样本(毫秒)"""
+        if not self.enabled:
+            return
+        with self.lock:
+            metric = self.metrics.get(name)
+            if metric is None:
+                metric = self.metrics[name] = Metric()
+            metric.add(ms)
+
+    def snapshot(self):
+        with self.lock:
+            return {name: metric.summary() for name, metric in sorted(self.metrics.items())}
+
+    def format_lines(self):
+        """统计浮窗中每项一行的简短文本"""
+        if not self.enabled:
+            return [f"统计未启用 (设置 {ENV_VAR}=1 或配置 stats.enabled)"]
+        return [
+            f"{name:<14} n={s['count']:<6} p50 {s['p50_ms']:.1f}  p99 {s['p99_ms']:.1f}  max {s['max_ms']:.1f} ms"
+            for name, s in self.snapshot().items()
+        ] or ["暂无数据"]
+
+    def dump(self, path=None):
+        """把统计保存为 JSON"""
+        path = path or self.dump_path
+        if not self.enabled or not path:
+            return
+        report = {
+            "started": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.started)),
+            "seconds": round(time.time() - self.started, 1),
+            "metrics": self.snapshot(),
+        }
+        try:
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=4, ensure_ascii=False)
+        except OSError as e:
+            print(f"保存统计失败: {e}")
+
+
+_instrumentation = None
+_instrumentation_lock = threading.Lock()
+
+
+def get_instrumentation():
+    """返回全局统计对象, 由环境变量或配置文件中的 stats 项决定是否启用"""
+    global _instrumentation
+    with _instrumentation_lock:
+        if _instrumentation is None:
+            _instrumentation = _create_instrumentation()
+    return _instrumentation
+
+
+def _create_instrumentation():
+    # 配置模块也会记录统计, 在这里导入避免循环导入
+    from config_manager import get_cache_dir, get_config_manager
+
+    config = get_config_manager().load_config() or {}
+    stats_config = config.get("stats", {})
+    env = os.environ.get(ENV_VAR, "").strip()
+    enabled = bool(stats_config.get("enabled")) or env not in ("", "0")
+    dump_path = stats_config.get("dump_path")
+    if env.lower().endswith(".json"):
+        dump_path = env
+    instrumentation = Instrumentation(enabled)
+    if enabled:
+        instrumentation.dump_path = dump_path or os.path.join(get_cache_dir(), "stats.json")
+        atexit.register(instrumentation.dump)
+    return instrumentation
@@ -0,0 +1,156 @@
+import tkinter as tk
+import tkinter.font as tkfont
+from bisect import bisect_right
+
+# 高亮推进的最短间隔(毫秒), 约 30 帧每秒
+FRAME_INTERVAL = 33
+# 最后一个字没有结束时间时, 按这个时长(秒)唱完
+DEFAULT_WORD_DURATION = 1.0
+
+
+class KaraokeCanvas(tk.Canvas):
+    """逐字高亮的歌词画布, 用来代替歌词标签
+
+    底层是普通颜色的整句歌词, 上面嵌入一个只放高亮颜色歌词的小画布,
+    嵌入窗口的宽度就是裁剪范围。换句时才设置文字并测量每个字的位置,
+    之后每帧只修改嵌入窗口的宽度, 宽度不变的帧什么都不做。
+    没有逐字时间或暂停时不安排任何定时器, 与标签模式的开销相同。
+    get_time 返回当前播放时间(秒)
+    """
+
+    def __init__(self, master, get_time, font, color, highlight_color, bg="black"):
+        super().__init__(master, bg=bg, highlightthickness=0, bd=0)
+        self.get_time = get_time
+        self.font = tkfont.Font(self, font=font)
+
+        self.text = ""
+        self.words = None
+        self.end_time = None
+        self.paused = False
+
+        # 换句时计算的布局: 每个字开始的时间和横坐标, 最后一项是整句的结束
+        self.times = None
+        self.offsets = None
+        self.clip_width = 0
+
+        self.layout_job = None
+        self.frame_job = None
+        self.frames = 0
+        self.updates = 0
+
+        self.base = self.create_text(0, 0, anchor="w", font=font, fill=color)
+        self.clip = tk.Canvas(self, bg=bg, highlightthickness=0, bd=0)
+        self.highlight = self.clip.create_text(0, 0, anchor="w", font=font, fill=highlight_color)
+        self.window = self.create_window(0, 0, anchor="nw", window=self.clip, width=1, state="hidden")
+        self.bind("<Configure>", lambda event: self.layout())
+
+    # 由 ViewModel 调用, 同一帧内的修改合并为一次布局
+    def set_text(self, text):
+        self.text = text
+        self.request_layout()
+
+    def set_words(self, value):
+        self.words, self.end_time = value or (None, None)
+        self.request_layout()
+
+    def set_paused(self, paused):
+        self.paused = paused
+        if paused:
+            self.cancel_frame()
+        elif self.offsets and self.frame_job is None:
+            self.tick()
+
+    def refresh(self):
+        """跳转后按新的时间重新推进高亮"""
+        self.cancel_frame()
+        if self.offsets:
+            self.tick()
+
+    def request_layout(self):
+        if self.layout_job is None:
+            self.layout_job = self.after_idle(self.layout)
+
+    def cancel_frame(self):
+        if self.frame_job is not None:
+            self.after_cancel(self.frame_job)
+            self.frame_job = None
+
+    def layout(self):
+        """设置文字并计算每个字的横坐标, 每句歌词只做一次"""
+        if self.layout_job is not None:
+            self.after_cancel(self.layout_job)
+            self.layout_job = None
+        self.cancel_frame()
+
+        width = self.winfo_width()
+        height = self.winfo_height()
+        line_width = self.font.measure(self.text)
+        # 与标签一样居中, 放不下时从左边开始
+        x = max(0, (width - line_width) // 2)
+        self.coords(self.base, x, height / 2)
+        self.itemconfigure(self.base, text=self.text)
+
+        if not self.words:
+            self.times = self.offsets = None
+            self.itemconfigure(self.window, state="hidden")
+            self.clip_width = 0
+            return
+
+        times = []
+        offsets = []
+        prefix = ""
+        for t, word in self.words:
+            times.append(t)
+            offsets.append(self.font.measure(prefix.lstrip()))
+            prefix += word
+        if self.words[-1][1]:
+            # 没有结束时间戳时唱到下一句开始
+            end = self.end_time if self.end_time is not None else times[-1] + DEFAULT_WORD_DURATION
+            times.append(max(end, times[-1]))
+            offsets.append(line_width)
+        else:
+            offsets[-1] = line_width
+        self.times = times
+        self.offsets = offsets
+
+        self.clip.coords(self.highlight, 0, height / 2)
+        self.clip.itemconfigure(self.highlight, text=self.text)
+        self.coords(self.window, x, 0)
+        self.itemconfigure(self.window, height=max(1, height))
+        self.clip_width = -1
+        self.tick()
+
+    def progress(self, t):
+        """t 时刻高亮部分的宽度(像素), 以及宽度增加 1 像素大约还要多少秒"""
+        times = self.times
+        offsets = self.offsets
+        k = bisect_right(times, t) - 1
+        if k < 0:
+            return 0, times[0] - t
+        if k >= len(times) - 1:
+            return offsets[-1], None
+        span = times[k + 1] - times[k]
+        pixels = offsets[k + 1] - offsets[k]
+        if span <= 0 or pixels <= 0:
+            return offsets[k + 1], max(0.0, times[k + 1] - t)
+        x = offsets[k] + pixels * (t - times[k]) / span
+        return int(x), min(span / pixels, times[k + 1] - t)
+
+    def tick(self):
+        """推进高亮: 只修改嵌入窗口的宽度, 唱完这句后停止"""
+        self.frame_job = None
+        self.frames += 1
+        width, wait = self.progress(self.get_time())
+        if width != self.clip_width:
+            if width > 0:
+                self.itemconfigure(self.window, width=width, state="normal")
+            else:
+                self.itemconfigure(self.window, state="hidden")
+            self.clip_width = width
+            self.updates += 1
+        if wait is None or self.paused:
+            return
+        self.frame_job = self.after(max(FRAME_INTERVAL, int(wait * 1000)), self.tick)
+
+    def stats(self):
+        return {"frames": self.frames, "updates": self.updates}
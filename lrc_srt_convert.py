@@ -1,3 +1,7 @@
+from lyric_timeline import split_words
+from subtitle_loader import parse_lrc
+
+
 def __load_file(path):
     if path.split(".")[len(path.split("."))-1] == "lrc":
         hh_list = []
@@ -5,21 +9,20 @@ def __load_file(path):
         ss_list = []
         mms_list = []
         content_list = []
-        file = open(path, "r", encoding="utf-8")
-        sub = file.readlines()
-        sub[0] = sub[0][1:len(sub[0])+1]
-        file.close()
-        for n in sub:
-            n = n.strip(" ")
-            n = n.strip("[")
-            content = n.split("]")[1]
-            time = n.split("]")[0]
-            hh_list.append(str(int(time.split(':')[0])//60).rjust(2, '0'))
-            mm_list.append(str(int(time.split(':')[0]) % 60).rjust(2, '0'))
-            ss_list.append(str(time.split(':')[1].split('.')[0]).rjust(2, '0'))
-            mms_list.append(
-                str(time.split(':')[1].split('.')[1]).ljust(3, '0'))
-            content_list.append(content)
+        # 与歌词窗口共用同一个 lrc 解析, 支持多个时间戳、offset 和 BOM
+        with open(path, "r", encoding="utf-8-sig") as file:
+            times, texts = parse_lrc(file.read())
+        for seconds, content in zip(times, texts):
+            ms = int(round(seconds * 1000))
+            hh, ms = divmod(ms, 3600000)
+            mm, ms = divmod(ms, 60000)
+            ss, ms = divmod(ms, 1000)
+            hh_list.append(str(hh).rjust(2, '0'))
+            mm_list.append(str(mm).rjust(2, '0'))
+            ss_list.append(str(ss).rjust(2, '0'))
+            mms_list.append(str(ms).rjust(3, '0'))
+            # srt 不支持逐字时间, 只保留文字
+            content_list.append(split_words(content, seconds)[0] + '\n')
         finallist = [hh_list, mm_list, ss_list, mms_list, content_list]
         return (finallist)
 
@@ -93,4 +96,8 @@ def convert(src, dst):
 
 
 if __name__ == '__main__':
-    convert("aaa.srt", "aaa.lrc")
+    import sys
+    if len(sys.argv) != 3:
+        print("用法: lrc_srt_convert.py <源文件.lrc|.srt> <目标文件.srt|.lrc>")
+        sys.exit(1)
+    convert(sys.argv[1], sys.argv[2])
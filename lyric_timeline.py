@@ -0,0 +1,116 @@
+import re
+from array import array
+from bisect import bisect_right
+
+# 增强 lrc 的逐字时间戳: <mm:ss.xx>
+_WORD_TAG = re.compile(r'<(\d+):(\d{1,2}(?:\.\d+)?)>')
+
+
+def split_words(text, line_time):
+    """拆分增强 lrc 歌词中的逐字时间戳
+
+    返回 (去掉时间戳的文本, ((秒, 文字), ...)), 没有逐字时间戳时第二项为 None。
+    第一个时间戳之前的文字从 line_time 开始, 末尾单独的时间戳作为
+    文字为空的一项, 表示这句唱完的时间
+    """
+    parts = _WORD_TAG.split(text)
+    if len(parts) == 1:
+        return text, None
+    words = []
+    if parts[0]:
+        words.append((line_time, parts[0]))
+    for i in range(1, len(parts), 3):
+        words.append((int(parts[i]) * 60 + float(parts[i + 1]), parts[i + 2]))
+    if words[-1][1] == '':
+        # 末尾的时间戳只保留一个
+        while len(words) > 1 and words[-2][1] == '':
+            del words[-2]
+    return ''.join(word for _, word in words).strip(), tuple(words)
+
+
+def join_words(words):
+    """split_words 的逆操作, 把逐字时间写回增强 lrc 格式的文本"""
+    return ''.join(f"<{int(t // 60):02d}:{t % 60:06.3f}>{word}" for t, word in words)
+
+
+class LyricTimeline:
+    """按时间排序的歌词时间轴
+
+    时间戳连续存放在 array('d') 中, 文本存放在平行的列表里,
+    查询当前歌词和下一句歌词都使用二分查找, 与歌词数量无关。
+    带逐字时间戳的歌词在创建时拆开, texts 中只保留纯文本,
+    逐字时间存放在 words[索引] 中, 大多数歌词没有逐字时间, 所以用字典。
+    metadata 是 lrc 的 [ti:]/[ar:] 等标签
+    """
+
+    def __init__(self, times=None, texts=None, metadata=None):
+        self.times = array('d', times or ())
+        self.texts = list(texts or ())
+        self.metadata = metadata or {}
+        if len(self.times) != len(self.texts):
+            raise ValueError("times 和 texts 长度不一致")
+        self.words = {}
+        if '<' not in '\0'.join(self.texts):
+            return
+        for i, text in enumerate(self.texts):
+            if '<' in text:
+                plain, words = split_words(text, self.times[i])
+                if words:
+                    self.texts[i] = plain
+                    self.words[i] = words
+
+    @classmethod
+    def from_pairs(cls, pairs):
+        """从 (秒, 文本) 序列创建时间轴, 会按时间戳稳定排序"""
+        pairs = sorted(pairs, key=lambda x: x[0])
+        return cls((p[0] for p in pairs), (p[1] for p in pairs))
+
+    def source_texts(self):
+        """带逐字时间戳的文本, 用于保存后重新创建时间轴"""
+        if not self.words:
+            return self.texts
+        texts = list(self.texts)
+        for i, words in self.words.items():
+            texts[i] = join_words(words)
+        return texts
+
+    def __len__(self):
+        return len(self.times)
+
+    def __getitem__(self, index):
+        return self.times[index], self.texts[index]
+
+    def __iter__(self):
+        return zip(self.times, self.texts)
+
+    def position(self, t):
+        """返回时间戳 <= t 的歌词数量, 即下一句待显示歌词的索引"""
+        return bisect_right(self.times, t)
+
+    def index_at(self, t):
+        """返回 t 时刻正在显示的歌词索引, 第一句之前返回 -1"""
+        return bisect_right(self.times, t) - 1
+
+    def text_at(self, t):
+        """返回 t 时刻正在显示的歌词文本, 没有则返回 None"""
+        index = self.index_at(t)
+        if index < 0:
+            return None
+        return self.texts[index]
+
+    def next_index(self, t):
+        """返回 t 之后第一句歌词的索引, 没有则返回 None"""
+        index = bisect_right(self.times, t)
+        if index >= len(self.times):
+            return None
+        return index
+
+    def next_time(self, t):
+        """返回 t 之后下一句歌词的时间戳, 没有则返回 None"""
+        index = self.next_index(t)
+        if index is None:
+            return None
+        return self.times[index]
+
+    def close(self):
+        """释放时间轴占用的资源, 普通时间轴没有需要释放的"""
@@ -1,94 +1,37 @@
 import tkinter as tk
-import pygame
-import time
-import ctypes
-import os
-import sys
-import json
-from lrc_srt_convert import convert
-from vtt2srt import vtt_to_srt
-from config_manager import ConfigManager
-import pystray
-from PIL import Image
-import io
-
-class LyricsDisplay(tk.Tk):
-    def __init__(self, music_file, main_window, subtitle_file=None):
-        super().__init__()
+from audio_backend import PygameAudioBackend
+from config_manager import get_config_manager
+from subtitle_loader import find_subtitle
+from subtitle_cache import get_subtitle_cache
+from media_probe import probe_duration
+from playback_engine import PlaybackEngine
+from tray_service import get_tray_service
+from view_model import ViewModel
+from karaoke_view import KaraokeCanvas
+from instrumentation import get_instrumentation
+
+# 统计浮窗的刷新间隔(毫秒)
+STATS_REFRESH_INTERVAL = 1000
+
+
+class LyricsDisplay(tk.Toplevel):
+    """歌词窗口
+
+    整个程序只创建一次, 作为主窗口的 Toplevel 在播放列表中复用,
+    换歌时由 load_track 替换歌词时间轴和音频。
+    播放和歌词定时逻辑在 PlaybackEngine 中, 这里只负责窗口、按键和播放列表,
+    并作为引擎的 host
+    """
+
+    def __init__(self, main_window):
+        super().__init__(main_window)
         
         self.main_window = main_window
         
-        # 初始化pygame音频(仅在播放音乐时)
-        if music_file:
-            pygame.mixer.init()
-            self.volume = 0.5
-            pygame.mixer.music.set_volume(self.volume)
+        # 与主窗口共享的配置
+        self.config_manager = get_config_manager()
+        self.config = self.config_manager.load_config()
         
-        # 读取配置文件
-        self.config = self.load_config()
-         
-        # 获取字幕文件路径
-        if subtitle_file:
-            lyrics_file = subtitle_file
-        elif music_file:
-            # 尝试不同的字幕文件命名格式
-            base_name = os.path.splitext(music_file)[0]
-            music_name = os.path.basename(music_file)
-            possible_lyrics = [
-                base_name + '.lrc',                    # a.lrc
-                base_name + '.srt',                    # a.srt
-                base_name + '.vtt',                    # a.vtt
-                music_file + '.lrc',                   # a.mp3.lrc
-                music_file + '.srt',                   # a.mp3.srt
-                music_file + '.vtt',                   # a.mp3.vtt
-                os.path.join(os.path.dirname(music_file), 'lyrics', os.path.basename(base_name) + '.lrc'),    # lyrics/a.lrc
-                os.path.join(os.path.dirname(music_file), 'lyrics', music_name + '.lrc'),                     # lyrics/a.mp3.lrc
-            ]
-            
-            # 查找存在的字幕文件
-            lyrics_file = None
-            for possible_file in possible_lyrics:
-                if os.path.exists(possible_file):
-                    lyrics_file = possible_file
-                    break
-                    
-            if not lyrics_file:
-                print("找不到对应的字幕文件!")
-                sys.exit()
-        else:
-            sys.exit()
-        
-        # 处理不同格式的字幕文件
-        if lyrics_file.endswith('.srt'):
-            lrc_file = lyrics_file.replace('.srt', '.lrc')
-            convert(lyrics_file, lrc_file)
-            lyrics_file = lrc_file
-        elif lyrics_file.endswith('.vtt'):
-            srt_file = lyrics_file.replace('.vtt', '.srt')
-            vtt_to_srt(lyrics_file)
-            lrc_file = srt_file.replace('.srt', '.lrc')
-            convert(srt_file, lrc_file)
-            lyrics_file = lrc_file
-            
-        self.lyrics = self.load_lyrics(lyrics_file)
-        self.current_index = 0
-        self.is_paused = False
-        self.pause_time = 0
-        self.music_file = music_file
-        self.music_start_time = time.time()
-        
-        # 如果有音乐文件则播放
-        if music_file:
-            pygame.mixer.music.load(music_file)
-            pygame.mixer.music.play()
-        
-        #告诉操作系统使用程序自身的dpi适配
-        ctypes.windll.shcore.SetProcessDpiAwareness(1)
-        #获取屏幕的缩放因子
-        ScaleFactor=ctypes.windll.shcore.GetScaleFactorForDevice(0)
-        #设置程序缩放
-        self.tk.call('tk', 'scaling', ScaleFactor/75)
-
         # 从配置文件中读取字体和颜色
         self.font_family = self.config["font"]["family"]
         self.font_size = self.config["font"]["size"]
@@ -117,9 +60,26 @@ class LyricsDisplay(tk.Tk):
         self.time_label = tk.Label(self, font=(self.time_font_family, self.time_font_size), fg=self.time_font_color, bg="black")
         self.time_label.pack(fill=tk.X, side=tk.TOP)
 
-        # 歌词标签，用于显示歌词
-        self.label = tk.Label(self, font=(self.font_family, self.font_size), fg=self.font_color, bg="black", anchor="center")
-        self.label.pack(fill=tk.BOTH)
+        # 歌词和时间只通过视图模型更新, 内容不变时不触碰控件
+        self.view = ViewModel(self)
+        self.view.bind("time", self.time_label)
+
+        karaoke = self.config.get("karaoke", {})
+        if karaoke.get("enabled", True):
+            # 逐字高亮的歌词画布, 没有逐字时间的歌词显示效果与标签相同
+            self.karaoke = KaraokeCanvas(self, lambda: self.engine.get_current_time(),
+                                         (self.font_family, self.font_size), self.font_color,
+                                         karaoke.get("highlight_color", "#FFFFFF"))
+            self.karaoke.pack(fill=tk.BOTH, expand=True)
+            self.view.bind("lyric", self.karaoke.set_text, None)
+            self.view.bind("words", self.karaoke.set_words, None)
+            self.view.bind("paused", self.karaoke.set_paused, None)
+        else:
+            self.karaoke = None
+            # 歌词标签，用于显示歌词
+            self.label = tk.Label(self, font=(self.font_family, self.font_size), fg=self.font_color, bg="black", anchor="center")
+            self.label.pack(fill=tk.BOTH)
+            self.view.bind("lyric", self.label)
 
         # 初始位置
         self.initial_x = 0
@@ -139,75 +99,74 @@ class LyricsDisplay(tk.Tk):
         self.bind("<Up>", self.volume_up)  # 向上键增加音量
         self.bind("<Down>", self.volume_down)  # 向下键降低音量
         self.bind("<Escape>", self.return_to_main)  # ESC键返回主界面
-        self.after(100, self.update_lyric)  # 每 100 毫秒更新一次歌词
-        
-        # 创建系统托盘图标
-        self.create_tray_icon()
-        self.icon.run_detached()
+
+        # 系统托盘图标由整个程序共用, 播放时菜单操作转发到这个窗口
+        self.tray = get_tray_service()
         
         # 绑定Ctrl-h事件
         self.bind("<Control-h>", self.toggle_window)
-    
-    def create_tray_icon(self):
-        # 获取图标路径
-        if getattr(sys, 'frozen', False):
-            icon_path = os.path.join(os.path.dirname(sys.argv[0]), 'icon.ico')
-        else:
-            icon_path = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'icon.ico')
-        
-        # 加载图标
-        try:
-            image = Image.open(icon_path)
-        except FileNotFoundError:
-            # 如果找不到图标文件，使用默认图标
-            image = self.create_default_icon()
-        
-        # 创建菜单
-        menu = (
-            pystray.MenuItem("显示", self.show_window),
-            pystray.MenuItem("退出", self.quit_program)
-        )
+
+        # 耗时统计, F3 显示或隐藏统计浮窗
+        self.stats = get_instrumentation()
+        self.stats_window = None
+        self.stats_job = None
+        self.bind("<F3>", self.toggle_stats)
+
+        # 播放引擎, 定时器挂在这个窗口上, 音频由 pygame 播放
+        self.engine = PlaybackEngine(self, PygameAudioBackend(), self, self.view, self.stats)
+
+    def load_track(self, music_file, subtitle_file=None):
+        """加载并播放一首歌(music_file 为 None 时只显示字幕), 找不到字幕时返回 False"""
+        self.engine.stop_timers()
         
-        # 创建系统托盘图标
-        self.icon = pystray.Icon(
-            "lyrics",
-            image,
-            "LRC Player",
-            menu
-        )
-    
-    def create_default_icon(self):
-        """创建默认图标"""
-        # 创建一个简单的图标 (16x16 的纯色图标)
-        icon_data = [
-            [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0],
-            [0, 0, 0, 0, 0, 1, 1, 1, 1, 1, 1, 0, 0, 0, 0, 0],
-            [0, 0, 0, 0, 1, 1, 1, 1, 1, 1, 1, 1, 0, 0, 0, 0],
-            [0, 0, 0, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 0, 0, 0],
-            [0, 0, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 0, 0],
-            [0, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 0],
-            [0, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 0],
-            [0, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 0],
-            [0, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 0],
-            [0, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 0],
-            [0, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 0],
-            [0, 0, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 0, 0],
-            [0, 0, 0, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 0, 0, 0],
-            [0, 0, 0, 0, 1, 1, 1, 1, 1, 1, 1, 1, 0, 0, 0, 0],
-            [0, 0, 0, 0, 0, 1, 1, 1, 1, 1, 1, 0, 0, 0, 0, 0],
-            [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0]
-        ]
+        # 获取字幕文件路径
+        lyrics_file = subtitle_file
+        if not lyrics_file and music_file:
+            # 尝试不同的字幕文件命名格式
+            lyrics_file = find_subtitle(music_file)
+        if not lyrics_file:
+            print("找不到对应的字幕文件!")
+            return False
         
-        image = Image.new('RGB', (16, 16), color='white')
-        pixels = image.load()
-        for y in range(16):
-            for x in range(16):
-                if icon_data[y][x]:
-                    pixels[x, y] = (74, 144, 226)  # 使用主题蓝色 #4a90e2
-                else:
-                    pixels[x, y] = (255, 255, 255)
-        return image
-    
+        # 直接解析 lrc/srt/vtt 字幕, 不再生成中间文件, 解析结果缓存在磁盘上
+        with self.stats.timer("subtitle_load"):
+            lyrics = self.load_lyrics(lyrics_file)
+        self.engine.load_track(music_file, lyrics)
+        self.tray.attach(self)
+        return True
+
+    def toggle_stats(self, event=None):
+        """显示或隐藏统计浮窗"""
+        if self.stats_window is not None:
+            self.after_cancel(self.stats_job)
+            self.stats_window.destroy()
+            self.stats_window = None
+            return
+        self.stats_window = tk.Toplevel(self)
+        self.stats_window.overrideredirect(True)
+        self.stats_window.attributes("-topmost", True)
+        self.stats_window.attributes("-alpha", 0.8)
+        self.stats_window.geometry(f"+{self.winfo_x()}+{self.winfo_y() + self.winfo_height()}")
+        self.stats_label = tk.Label(self.stats_window, font=("Consolas", 8), fg="#FFFFFF", bg="black",
+                                    justify=tk.LEFT, anchor="w")
+        self.stats_label.pack(fill=tk.BOTH)
+        self.refresh_stats()
+
+    def refresh_stats(self):
+        lines = self.stats.format_lines()
+        view = self.view.stats()
+        lines.append(f"控件更新 {view['updates_per_second']} 次/秒, 共 {view['updates']} 次 / {view['frames']} 帧")
+        if self.karaoke:
+            lines.append(f"逐字高亮 {self.karaoke.stats()}")
+        cache = get_subtitle_cache(self.config).stats()
+        lines.append(f"字幕缓存 命中 {cache['hits']} 未命中 {cache['misses']} 映射 {cache['mapped']}")
+        playback = self.engine.playback_stats()
+        if playback:
+            lines.append(f"时钟偏差 {playback['clock']['last_ms']} ms")
+            lines.append(f"跳转 {playback['seek']['seeks']}/{playback['seek']['requests']} 次")
+        self.stats_label.config(text="\n".join(lines))
+        self.stats_job = self.after(STATS_REFRESH_INTERVAL, self.refresh_stats)
+
     def toggle_window(self, event=None):
         """切换窗口显示状态"""
         self.withdraw()  # 隐藏窗口
@@ -220,183 +179,97 @@ class LyricsDisplay(tk.Tk):
         
     def quit_program(self, icon=None, item=None):
         """退出程序"""
-        if self.icon._running:
-            self.icon.stop()  # 停止系统托盘图标
+        self.tray.detach(self)
+        self.tray.stop()  # 停止系统托盘图标
         self.save_window_position()
-        if hasattr(pygame.mixer, 'music') and self.music_file:  # 检查 pygame.mixer 是否已初始化
-            try:
-                pygame.mixer.music.stop()
-                pygame.mixer.quit()
-            except pygame.error:
-                pass  # 忽略 pygame 相关错误
+        self.engine.shutdown()
+        # 歌词窗口是主窗口的子窗口, 会一起销毁
         self.main_window.destroy()
-        self.quit()
-        self.destroy()
 
-        
     def return_to_main(self, event=None):
         """返回主界面"""
-        if self.icon._running:
-            self.icon.stop()  # 停止系统托盘图标
-        self.save_window_position()
-        pygame.mixer.music.stop()
-        self.destroy()
         # 如果是从文件夹打开的,则返回主界面,否则退出程序
-        if len(self.main_window.playlist) > 1:
-            self.main_window.deiconify()
-        else:
-            self.main_window.destroy()
+        if len(self.main_window.playlist) <= 1:
+            self.quit_program()
+            return
+        self.save_window_position()
+        self.engine.stop()
+        # 回到主界面时不显示托盘图标, 避免从托盘显示已停止的歌词窗口
+        self.tray.detach(self)
+        self.tray.stop()
+        # 隐藏歌词窗口, 下次播放时复用
+        self.withdraw()
+        self.main_window.deiconify()
     
     def volume_up(self, event):
         """增加音量"""
-        self.volume = min(1.0, self.volume + 0.1)
-        pygame.mixer.music.set_volume(self.volume)
+        self.engine.set_volume(self.engine.volume + 0.1)
         
     def volume_down(self, event):
         """降低音量"""
-        self.volume = max(0.0, self.volume - 0.1)
-        pygame.mixer.music.set_volume(self.volume)
-        
-    def load_config(self):
-        """加载配置文件"""
-        if getattr(sys, 'frozen', False):
-            config_path = os.path.join(os.path.dirname(sys.argv[0]), 'config.json')
-        else:
-            config_path = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'config.json')
-        
+        self.engine.set_volume(self.engine.volume - 0.1)
+
+    # PlaybackEngine 的 host 接口
+    def load_lyrics(self, subtitle_file):
+        return get_subtitle_cache(self.config).load(subtitle_file)
+
+    def find_subtitle(self, music_file):
+        return find_subtitle(music_file)
+
+    def get_track_duration(self, music_file):
+        """音乐时长(秒), 优先使用播放列表中已读取的时长"""
+        info = self.main_window.track_info.get(music_file)
+        if info:
+            return info[1]
         try:
-            with open(config_path, 'r') as f:
-                return json.load(f)
-        except FileNotFoundError:
-            print(f"Error: {config_path} not found!")
+            return probe_duration(music_file)
+        except (OSError, ValueError):
             return None
 
-    def load_lyrics(self, lyrics_file):
-        lyrics = []
-        with open(lyrics_file, 'r', encoding='utf-8') as file:
-            for line in file:
-                if line.strip():
-                    try:
-                        time_str, text = line.split(']')  # 获取时间戳和歌词文本
-                        time_str = time_str.strip('[')  # 去除 '['
-                        # 检查是否是有效的时间戳格式（包含冒号）
-                        if ':' in time_str:
-                            minutes, seconds = map(float, time_str.split(':'))
-                            time_in_seconds = minutes * 60 + seconds  # 转换为秒
-                            lyrics.append((time_in_seconds, text.strip()))
-                    except (ValueError, IndexError):
-                        # 跳过无法解析的行（比如元数据标签）
-                        continue
-        return sorted(lyrics, key=lambda x: x[0])  # 按时间戳排序
-
-    def get_current_time(self):
-        if self.is_paused:
-            return pygame.mixer.music.get_pos() / 1000.0
+    def get_next_track(self):
+        """播放列表中的下一首 (音乐路径, 字幕路径), 没有时返回 None"""
+        index = self.main_window.current_index + 1
+        if index >= len(self.main_window.playlist):
+            return None
+        music_file = self.main_window.playlist[index]
+        return music_file, self.main_window.get_subtitle(music_file)
+
+    def on_track_switched(self, music_file):
+        """按路径找到正在播放的歌曲, 预加载之后播放列表可能已经变化"""
+        playlist = self.main_window.playlist
+        if music_file in playlist:
+            self.main_window.current_index = playlist.index(music_file)
+        # 已从播放列表删除时 current_index 仍指向它前面的歌曲, 下一首不变
+
+    def forget_next_track(self, paths):
+        """播放列表删除或改名了 paths, 预加载的下一首在其中时重新选择"""
+        self.engine.forget_next_track(paths)
+
+    def on_track_finished(self):
+        if len(self.main_window.playlist) > 1:
+            self.main_window.play_next()
         else:
-            return time.time() - self.music_start_time
-
-    def update_lyric(self):
-        if not self.is_paused:
-            current_time = time.time() - self.music_start_time
-
-            # 将时间格式化为分钟:秒
-            minutes = int(current_time // 60)
-            seconds = int(current_time % 60)
-            current_time_str = f"{minutes:02}:{seconds:02}"
-
-            # 更新时间标签
-            self.time_label.config(text=current_time_str)
-
-            # 如果当前时间大于或等于歌词的时间戳，则显示该歌词
-            while self.current_index < len(self.lyrics) and current_time >= self.lyrics[self.current_index][0]:
-                self.label.config(text=self.lyrics[self.current_index][1])
-                self.current_index += 1
-
-            # 检查是否播放完毕
-            if self.current_index >= len(self.lyrics):
-                # 如果是音乐模式，等待音乐播放完毕
-                if self.music_file:
-                    if not pygame.mixer.music.get_busy():
-                        if len(self.main_window.playlist) > 1:
-                            self.destroy()
-                            self.main_window.play_next()
-                        else:
-                            self.quit_program()
-                # 如果是纯字幕模式，直接结束
-                else:
-                    if len(self.main_window.playlist) > 1:
-                        self.destroy()
-                        self.main_window.play_next()
-                    else:
-                        self.quit_program()
-                    return  # 防止继续调用 after
-
-        self.after(100, self.update_lyric)
-
-    def update_display_after_time_change(self, new_time):
-        # 更新当前索引
-        self.current_index = 0
-        for i, (time_stamp, _) in enumerate(self.lyrics):
-            if time_stamp <= new_time:
-                self.current_index = i + 1
-            else:
-                break
-
-        # 更新显示的歌词
-        if self.current_index > 0:
-            self.label.config(text=self.lyrics[self.current_index - 1][1])
+            self.quit_program()
 
     def toggle_pause(self, event):
-        if self.is_paused:
-            if self.music_file:
-                pygame.mixer.music.unpause()
-            self.is_paused = False
-            self.music_start_time = time.time() - self.pause_time
-        else:
-            if self.music_file:
-                pygame.mixer.music.pause()
-            self.is_paused = True
-            self.pause_time = time.time() - self.music_start_time
+        self.engine.toggle_pause()
+
+    def seek_by(self, delta):
+        self.engine.seek_by(delta)
+        if self.karaoke:
+            self.karaoke.refresh()
 
     def rewind_1_second(self, event):
-        current_time = self.get_current_time()
-        new_time = max(0, current_time - 5.0)
-        if self.music_file:
-            pygame.mixer.music.stop()
-            pygame.mixer.music.load(self.music_file)
-            pygame.mixer.music.play(start=new_time)
-        self.music_start_time = time.time() - new_time
-        self.update_display_after_time_change(new_time)
+        self.seek_by(-5.0)
 
     def fast_forward_1_second(self, event):
-        current_time = self.get_current_time()
-        new_time = current_time + 5.0
-        if self.music_file:
-            pygame.mixer.music.stop()
-            pygame.mixer.music.load(self.music_file)
-            pygame.mixer.music.play(start=new_time)
-        self.music_start_time = time.time() - new_time
-        self.update_display_after_time_change(new_time)
+        self.seek_by(5.0)
 
     def rewind_1_minute(self, event):
-        current_time = self.get_current_time()
-        new_time = max(0, current_time - 30.0)
-        if self.music_file:
-            pygame.mixer.music.stop()
-            pygame.mixer.music.load(self.music_file)
-            pygame.mixer.music.play(start=new_time)
-        self.music_start_time = time.time() - new_time
-        self.update_display_after_time_change(new_time)
+        self.seek_by(-30.0)
 
     def fast_forward_1_minute(self, event):
-        current_time = self.get_current_time()
-        new_time = current_time + 30.0
-        if self.music_file:
-            pygame.mixer.music.stop()
-            pygame.mixer.music.load(self.music_file)
-            pygame.mixer.music.play(start=new_time)
-        self.music_start_time = time.time() - new_time
-        self.update_display_after_time_change(new_time)
+        self.seek_by(30.0)
 
     def on_button_press(self, event):
         # 记录鼠标按下时的位置
@@ -419,16 +292,7 @@ class LyricsDisplay(tk.Tk):
         self.save_window_position()
 
     def save_window_position(self):
-        """保存窗口位置到配置文件"""
+        """保存窗口位置, 由配置存储合并后写入文件"""
         self.config["window"]["initial_position"]["x"] = self.winfo_x()
         self.config["window"]["initial_position"]["y"] = self.winfo_y()
-        
-        # 获取配置文件路径
-        if getattr(sys, 'frozen', False):
-            config_path = os.path.join(os.path.dirname(sys.argv[0]), 'config.json')
-        else:
-            config_path = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'config.json')
-        
-        # 保存配置
-        with open(config_path, 'w') as f:
-            json.dump(self.config, f, indent=4)
\ No newline at end of file
+        self.config_manager.save_config()
@@ -1,16 +1,42 @@
 import tkinter as tk
 from tkinter import filedialog, ttk
+import ctypes
 import os
 import sys
-import json
-import pygame
-from mutagen.mp3 import MP3
-from lyrics_display import LyricsDisplay
-from config_manager import ConfigManager
+import queue
+from config_manager import get_config_manager
+from playlist_view import VirtualPlaylist
+
+# 检查后台扫描结果的间隔(毫秒)
+SCAN_POLL_INTERVAL = 50
+# 检查文件夹变化的间隔(毫秒)
+WATCH_POLL_INTERVAL = 500
+
+
+def set_dpi_awareness():
+    """Windows 上使用程序自身的 DPI 适配, 返回屏幕的缩放因子, 其他平台返回 None
+
+    必须在创建任何窗口之前调用
+    """
+    if sys.platform != 'win32':
+        return None
+    try:
+        #告诉操作系统使用程序自身的dpi适配
+        ctypes.windll.shcore.SetProcessDpiAwareness(1)
+        #获取屏幕的缩放因子
+        return ctypes.windll.shcore.GetScaleFactorForDevice(0)
+    except (AttributeError, OSError):
+        return None  # Windows 8.1 之前没有 shcore
+
 
 class MainWindow(tk.Tk):
     def __init__(self):
+        # 所有窗口共用一个 Tk 解释器, 缩放在创建主窗口前设置一次
+        ScaleFactor = set_dpi_awareness()
         super().__init__()
+        if ScaleFactor:
+            #设置程序缩放
+            self.tk.call('tk', 'scaling', ScaleFactor/75)
         
         # 设置窗口图标
         if getattr(sys, 'frozen', False):
@@ -24,7 +50,7 @@ class MainWindow(tk.Tk):
             pass  # 如果图标文件不存在，使用默认图标
         
         # 加载配置文件
-        self.config_manager = ConfigManager()
+        self.config_manager = get_config_manager()
         self.config = self.config_manager.load_config()
         
         self.title("音乐播放器")
@@ -41,6 +67,25 @@ class MainWindow(tk.Tk):
         self.playlist = []
         self.current_index = 0
         
+        # 播放列表中每个文件的 (显示名称, 时长) 和对应的字幕路径
+        self.track_info = {}
+        self.subtitle_paths = {}
+        self.sort_column = None
+        self.sort_reverse = False
+        
+        # 复用的歌词窗口
+        self.lyrics_window = None
+        
+        # 后台扫描文件夹
+        self.scanner = None
+        self.scan_job = None
+        self.scan_total = None
+        
+        # 扫描完成后监视文件夹, 只处理增加、删除和改名的文件
+        self.folder_path = None
+        self.watcher = None
+        self.watch_job = None
+        
         # 设置窗口样式
         self.configure(bg="#f0f0f0")
         
@@ -78,162 +123,6 @@ class MainWindow(tk.Tk):
                        padding=(10, 5))
         
 
-    def create_widgets(self):
-        # 创建顶部框架
-        top_frame = tk.Frame(self, bg="#4a90e2")
-        top_frame.pack(fill=tk.X, pady=0)
-        
-        # 创建按钮框架
-        self._create_buttons(top_frame)
-        
-        # 创建播放列表
-        self._create_playlist()
-
-    def _create_buttons(self, parent):
-        btn_frame = tk.Frame(parent, bg="#4a90e2")
-        btn_frame.pack(pady=12)
-        
-        # 创建打开文件夹按钮
-        self.open_folder_btn = tk.Button(btn_frame, 
-                                 text="打开文件夹",
-                                 font=('微软雅黑', 11),
-                                 bg="#ffffff",
-                                 fg="#4a90e2",
-                                 relief="flat",
-                                 padx=20,
-                                 command=self.open_folder)
-        self.open_folder_btn.pack(side=tk.LEFT, padx=5)
-        
-        # 创建打开文件按钮
-        self.open_file_btn = tk.Button(btn_frame,
-                                text="打开文件",
-                                font=('微软雅黑', 11),
-                                bg="#ffffff", 
-                                fg="#4a90e2",
-                                relief="flat",
-                                padx=20,
-                                command=self.open_file)
-        self.open_file_btn.pack(side=tk.LEFT, padx=5)
-        
-        # 创建打开字幕按钮
-        self.open_subtitle_btn = tk.Button(btn_frame,
-                                text="打开字幕",
-                                font=('微软雅黑', 11),
-                                bg="#ffffff", 
-                                fg="#4a90e2",
-                                relief="flat",
-                                padx=20,
-                                command=self.open_subtitle)
-        self.open_subtitle_btn.pack(side=tk.LEFT, padx=5)
-
-    def _create_playlist(self):
-        list_frame = tk.Frame(self, bg="#ffffff")
-        list_frame.pack(fill=tk.BOTH, expand=True, padx=20, pady=15)
-        
-        # 创建滚动条
-        scrollbar = ttk.Scrollbar(list_frame)
-        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-        
-        # 创建树形视图
-        self.tree = ttk.Treeview(list_frame, 
-                                columns=("文件名", "时长"), 
-                                show="headings",
-                                yscrollcommand=scrollbar.set)
-        
-        # 设置列
-        self.tree.heading("文件名", text="歌曲名称")
-        self.tree.heading("时长", text="时长")
-        self.tree.column("文件名", width=400)
-        self.tree.column("时长", width=100, anchor="center")
-        
-        # 设置交替行颜色
-        self.tree.tag_configure('oddrow', background='#f9f9f9')
-        self.tree.tag_configure('evenrow', background='#ffffff')
-        
-        self.tree.pack(fill=tk.BOTH, expand=True)
-        
-        # 配置滚动条
-        scrollbar.config(command=self.tree.yview)
-        
-        # 绑定双击事件
-        self.tree.bind("<Double-1>", self.play_selected)
-
-    def open_folder(self):
-        folder_path = filedialog.askdirectory()
-        if folder_path:
-            self.playlist.clear()
-            self.tree.delete(*self.tree.get_children())
-            
-            # 初��化pygame mixer用于非mp3文件
-            pygame.mixer.init()
-            
-            # 遍历文件夹中的音乐文件
-            row_count = 0
-            for file in os.listdir(folder_path):
-                if file.endswith(('.mp3', '.wav')):
-                    music_path = os.path.join(folder_path, file)
-                    self.playlist.append(music_path)
-                    
-                    # 获取音乐时长
-                    if file.endswith('.mp3'):
-                        # 使用mutagen读取mp3时长
-                        audio = MP3(music_path)
-                        duration = audio.info.length
-                    else:
-                        # 其他格式用pygame读取
-                        sound = pygame.mixer.Sound(music_path)
-                        duration = sound.get_length()
-                        
-                    minutes = int(duration // 60)
-                    seconds = int(duration % 60)
-                    duration_str = f"{minutes:02d}:{seconds:02d}"
-                    
-                    # 去掉文件后缀显示
-                    display_name = os.path.splitext(file)[0]
-                    
-                    # 设置交替行颜色
-                    tag = 'evenrow' if row_count % 2 == 0 else 'oddrow'
-                    self.tree.insert("", "end", values=(display_name, duration_str), tags=(tag,))
-                    row_count += 1
-            
-            # 退出pygame mixer        
-            pygame.mixer.quit()
-
-    def open_file(self):
-        """打开单个音乐文件"""
-        file_path = filedialog.askopenfilename(filetypes=[("音频文件", "*.mp3;*.wav")])
-        if file_path:
-            self.playlist = [file_path]
-            self.current_index = 0
-            self.tree.delete(*self.tree.get_children())
-            
-            # 直接播放文件
-            self.withdraw()
-            lyrics_window = LyricsDisplay(file_path, self)
-            lyrics_window.mainloop()
-
-    def play_selected(self, event):
-        selected_item = self.tree.selection()
-        if selected_item:
-            self.current_index = self.tree.index(selected_item)
-            music_file = self.playlist[self.current_index]
-            # 隐藏主窗口
-            self.withdraw()
-            # 创建并显示歌词窗口
-            lyrics_window = LyricsDisplay(music_file, self)
-            lyrics_window.mainloop()
-
-    def play_next(self):
-        """播放下一首歌"""
-        self.current_index += 1
-        if self.current_index < len(self.playlist):
-            music_file = self.playlist[self.current_index]
-            lyrics_window = LyricsDisplay(music_file, self)
-            lyrics_window.mainloop()
-        else:
-            self.destroy()  # 播放列表结束,直接退出程序
-
-
     def on_window_configure(self, event):
         """窗口大小或位置改变时的回调"""
         if event.widget == self:
@@ -242,7 +131,11 @@ class MainWindow(tk.Tk):
     def on_closing(self):
         """窗口关闭时的回调"""
         self.save_window_config()
-        self.quit()
+        self.stop_watching()
+        if self.lyrics_window is not None:
+            self.lyrics_window.quit_program()
+        else:
+            self.quit()
 
     def save_window_config(self):
         """保存窗口配置"""
@@ -254,22 +147,8 @@ class MainWindow(tk.Tk):
         self.config['main_window']['initial_position']['x'] = self.winfo_x()
         self.config['main_window']['initial_position']['y'] = self.winfo_y()
         
-        # 保存配置到文件
-        self.config_manager.save_config(self.config)
-        
-    def load_config(self):
-        """加载配置文件"""
-        if getattr(sys, 'frozen', False):
-            config_path = os.path.join(os.path.dirname(sys.argv[0]), 'config.json')
-        else:
-            config_path = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'config.json')
-        
-        try:
-            with open(config_path, 'r') as f:
-                return json.load(f)
-        except FileNotFoundError:
-            print(f"Error: {config_path} not found!")
-            return None
+        # 由配置存储合并后写入文件
+        self.config_manager.save_config()
         
     def create_widgets(self):
         # 创建顶部框架
@@ -313,95 +192,257 @@ class MainWindow(tk.Tk):
                                 command=self.open_subtitle)
         self.open_subtitle_btn.pack(side=tk.LEFT, padx=5)
         
+        # 扫描进度
+        self.status_label = tk.Label(self, text="", bg="#f0f0f0", fg="#888888", font=('微软雅黑', 9))
+        self.status_label.pack(side=tk.BOTTOM, fill=tk.X)
+        
         # 创建播放列表框架
         list_frame = tk.Frame(self, bg="#ffffff")
         list_frame.pack(fill=tk.BOTH, expand=True, padx=20, pady=15)
         
-        # 创建播放列表
-        self.tree = ttk.Treeview(list_frame, columns=("文件名", "时长"), show="headings")
-        self.tree.heading("文件名", text="歌曲名称")
-        self.tree.heading("时长", text="时长")
-        self.tree.column("文件名", width=400)
-        self.tree.column("时长", width=100, anchor="center")
-        self.tree.pack(fill=tk.BOTH, expand=True)
-        
-        # 绑定双击事件
-        self.tree.bind("<Double-1>", self.play_selected)
+        # 创建播放列表, 只创建可见的行
+        self.playlist_view = VirtualPlaylist(
+            list_frame,
+            columns=(("文件名", "歌曲名称", 400, "w"), ("时长", "时长", 100, "center")),
+            row_source=self.get_row,
+            on_activate=self.play_selected,
+            on_sort=self.sort_playlist,
+            bg="#ffffff")
+        self.playlist_view.pack(fill=tk.BOTH, expand=True)
         
     def open_file(self):
         """打开单个音乐文件"""
-        file_path = filedialog.askopenfilename(filetypes=[("音频文件", "*.mp3;*.wav")])
+        file_path = filedialog.askopenfilename(filetypes=[("音频文件", "*.mp3;*.wav;*.flac;*.ogg")])
         if file_path:
-            self.playlist = [file_path]
-            self.current_index = 0
-            self.tree.delete(*self.tree.get_children())
+            self.reset_playlist()
+            self.playlist.append(file_path)
             
             # 直接播放文件
             self.withdraw()
-            lyrics_window = LyricsDisplay(file_path, self)
-            lyrics_window.mainloop()
+            self.open_lyrics(file_path)
             
     def open_folder(self):
         folder_path = filedialog.askdirectory()
         if folder_path:
-            self.playlist.clear()
-            self.tree.delete(*self.tree.get_children())
-            
-            # 初始化pygame mixer用于非mp3文件
-            pygame.mixer.init()
-            
-            # 遍历文件夹中的音乐文件
-            row_count = 0
-            for file in os.listdir(folder_path):
-                if file.endswith(('.mp3', '.wav')):
-                    music_path = os.path.join(folder_path, file)
-                    self.playlist.append(music_path)
-                    
-                    # 获取音乐时长
-                    if file.endswith('.mp3'):
-                        # 使用mutagen读取mp3时长
-                        audio = MP3(music_path)
-                        duration = audio.info.length
-                    else:
-                        # 其他格式用pygame读取
-                        sound = pygame.mixer.Sound(music_path)
-                        duration = sound.get_length()
-                        
-                    minutes = int(duration // 60)
-                    seconds = int(duration % 60)
-                    duration_str = f"{minutes:02d}:{seconds:02d}"
-                    
-                    # 去掉文件后缀显示
-                    display_name = os.path.splitext(file)[0]
-                    
-                    # 设置交替行颜色
-                    tag = 'evenrow' if row_count % 2 == 0 else 'oddrow'
-                    self.tree.insert("", "end", values=(display_name, duration_str), tags=(tag,))
-                    row_count += 1
+            self.reset_playlist()
+            self.folder_path = folder_path
             
-            # 退出pygame mixer        
-            pygame.mixer.quit()
+            # 在后台线程中读取音乐信息, 结果分批加入播放列表
+            # 扫描用到的 sqlite3 和线程池在第一次打开文件夹时才导入
+            from folder_scanner import FolderScanner
+            self.scanner = FolderScanner(folder_path)
+            self.scanner.start()
+            self.status_label.config(text="正在扫描...")
+            self.scan_job = self.after(SCAN_POLL_INTERVAL, self.poll_scanner)
+
+    def reset_playlist(self):
+        """清空播放列表, 取消还没完成的扫描和文件夹监视"""
+        if self.scanner:
+            self.scanner.cancel()
+            self.scanner = None
+        if self.scan_job:
+            self.after_cancel(self.scan_job)
+            self.scan_job = None
+        self.scan_total = None
+        self.stop_watching()
+        self.folder_path = None
+        
+        self.playlist.clear()
+        self.current_index = 0
+        self.track_info.clear()
+        self.subtitle_paths.clear()
+        self.sort_column = None
+        self.playlist_view.clear()
+        self.status_label.config(text="")
+
+    def poll_scanner(self):
+        """取出后台扫描的结果并加入播放列表"""
+        self.scan_job = None
+        done = False
+        try:
+            while True:
+                kind, data = self.scanner.queue.get_nowait()
+                if kind == "total":
+                    self.scan_total = data
+                elif kind == "tracks":
+                    self.add_tracks(data)
+                else:
+                    done = True
+                    break
+        except queue.Empty:
+            pass
+        
+        if done:
+            self.scanner = None
+            self.status_label.config(text=f"共 {len(self.playlist)} 首")
+            self.start_watching()
+        else:
+            total = "?" if self.scan_total is None else self.scan_total
+            self.status_label.config(text=f"已加载 {len(self.playlist)}/{total}")
+            self.scan_job = self.after(SCAN_POLL_INTERVAL, self.poll_scanner)
+
+    def add_tracks(self, tracks):
+        """把一批 (路径, 显示名称, 时长, 字幕路径) 加入播放列表, 已有的文件只更新信息"""
+        for music_path, display_name, duration, subtitle_path in tracks:
+            if music_path not in self.track_info:
+                self.playlist.append(music_path)
+            self.track_info[music_path] = (display_name, duration)
+            self.subtitle_paths[music_path] = subtitle_path
+        self.playlist_view.set_count(len(self.playlist))
+
+    def remove_tracks(self, paths):
+        """从播放列表删除文件, current_index 仍指向正在播放的歌曲"""
+        removed = {path for path in paths if path in self.track_info}
+        if not removed:
+            return
+        current = self.current_index
+        selected = self.playlist_view.selected_index()
+        selected = self.playlist[selected] if selected is not None else None
+        
+        # 正在播放的歌曲被删除时, 指向它前面的位置, 下一首仍是原来的下一首
+        before = sum(1 for path in self.playlist[:current] if path not in removed)
+        if 0 <= current < len(self.playlist) and self.playlist[current] not in removed:
+            self.current_index = before
+        else:
+            self.current_index = before - 1
+        self.playlist[:] = [path for path in self.playlist if path not in removed]
+        for path in removed:
+            del self.track_info[path]
+            self.subtitle_paths.pop(path, None)
+        
+        self.playlist_view.selected = None
+        if selected is not None and selected not in removed:
+            self.playlist_view.selected = self.playlist.index(selected)
+        self.playlist_view.set_count(len(self.playlist))
+        self.forget_next_track(removed)
+
+    def rename_tracks(self, renames):
+        """改名的文件保留在原来的位置, 时长沿用之前读取的结果"""
+        renamed = set()
+        for old_path, new_path, display_name, subtitle_path in renames:
+            info = self.track_info.pop(old_path, None)
+            if info is None:
+                continue
+            self.subtitle_paths.pop(old_path, None)
+            self.track_info[new_path] = (display_name, info[1])
+            self.subtitle_paths[new_path] = subtitle_path
+            self.playlist[self.playlist.index(old_path)] = new_path
+            renamed.add(old_path)
+        self.playlist_view.refresh()
+        self.forget_next_track(renamed)
+
+    def forget_next_track(self, paths):
+        """已预加载的下一首被删除或改名时, 由歌词窗口按新的播放列表重新加入队列"""
+        if paths and self.lyrics_window is not None:
+            self.lyrics_window.forget_next_track(paths)
+
+    def start_watching(self):
+        """监视当前文件夹, 新下载的歌曲自动加入播放列表"""
+        watch = self.config.get("watch", {})
+        if not self.folder_path or not watch.get("enabled", True):
+            return
+        from folder_watcher import FolderWatcher, POLL_INTERVAL
+        self.watcher = FolderWatcher(self.folder_path, self.playlist,
+                                     watch.get("poll_interval", POLL_INTERVAL))
+        self.watcher.start()
+        self.watch_job = self.after(WATCH_POLL_INTERVAL, self.poll_watcher)
+
+    def stop_watching(self):
+        if self.watcher:
+            self.watcher.cancel()
+            self.watcher = None
+        if self.watch_job:
+            self.after_cancel(self.watch_job)
+            self.watch_job = None
+
+    def poll_watcher(self):
+        """取出文件夹的变化并更新播放列表"""
+        self.watch_job = None
+        changed = False
+        try:
+            while True:
+                kind, data = self.watcher.queue.get_nowait()
+                if kind == "tracks":
+                    self.add_tracks(data)
+                elif kind == "removed":
+                    self.remove_tracks(data)
+                elif kind == "renamed":
+                    self.rename_tracks(data)
+                changed = True
+        except queue.Empty:
+            pass
+        
+        if changed:
+            self.status_label.config(text=f"共 {len(self.playlist)} 首")
+        self.watch_job = self.after(WATCH_POLL_INTERVAL, self.poll_watcher)
+
+    def get_row(self, index):
+        """播放列表第 index 行显示的值"""
+        display_name, duration = self.track_info[self.playlist[index]]
+        minutes = int(duration // 60)
+        seconds = int(duration % 60)
+        return display_name, f"{minutes:02d}:{seconds:02d}"
+
+    def sort_playlist(self, column):
+        """按歌曲名称或时长排序, 再次点击同一列时倒序"""
+        if self.sort_column == column:
+            self.sort_reverse = not self.sort_reverse
+        else:
+            self.sort_column = column
+            self.sort_reverse = False
+        
+        key = 0 if column == "文件名" else 1
+        current = self.playlist[self.current_index] if 0 <= self.current_index < len(self.playlist) else None
+        selected = self.playlist_view.selected_index()
+        selected = self.playlist[selected] if selected is not None else None
+        
+        track_info = self.track_info
+        self.playlist.sort(key=lambda path: track_info[path][key], reverse=self.sort_reverse)
+        
+        # 排序后保持当前播放和选中的歌曲不变
+        if current is not None:
+            self.current_index = self.playlist.index(current)
+        if selected is not None:
+            self.playlist_view.selected = self.playlist.index(selected)
+        self.playlist_view.refresh()
+
+    def get_subtitle(self, music_file):
+        """返回索引中记录的字幕路径, 字幕已不存在时返回 None 由歌词窗口重新查找"""
+        subtitle_path = self.subtitle_paths.get(music_file)
+        if subtitle_path and os.path.exists(subtitle_path):
+            return subtitle_path
+        return None
                     
-    def play_selected(self, event):
-        selected_item = self.tree.selection()
-        if selected_item:
-            self.current_index = self.tree.index(selected_item)
-            music_file = self.playlist[self.current_index]
-            # 隐藏主窗口
-            self.withdraw()
-            # 创建并显示歌词窗口
-            lyrics_window = LyricsDisplay(music_file, self)
-            lyrics_window.mainloop()
+    def play_selected(self, index):
+        self.current_index = index
+        music_file = self.playlist[self.current_index]
+        # 隐藏主窗口
+        self.withdraw()
+        # 创建并显示歌词窗口
+        self.open_lyrics(music_file, self.get_subtitle(music_file))
             
     def play_next(self):
         """播放下一首歌"""
         self.current_index += 1
         if self.current_index < len(self.playlist):
             music_file = self.playlist[self.current_index]
-            lyrics_window = LyricsDisplay(music_file, self)
-            lyrics_window.mainloop()
+            self.open_lyrics(music_file, self.get_subtitle(music_file))
         else:
-            self.quit()  # 播放列表结束,退出程序
+            self.lyrics_window.quit_program()  # 播放列表结束,退出程序
+
+    def open_lyrics(self, music_file, subtitle_file=None):
+        """在歌词窗口中播放, 歌词窗口只创建一次, 换歌时复用"""
+        if self.lyrics_window is None:
+            # 歌词窗口依赖 pygame、pystray 和 PIL, 在第一次播放时才导入,
+            # 主窗口不需要等待这些库加载
+            from lyrics_display import LyricsDisplay
+            self.lyrics_window = LyricsDisplay(self)
+        if not self.lyrics_window.load_track(music_file, subtitle_file):
+            # 找不到字幕, 回到主界面
+            self.lyrics_window.withdraw()
+            self.deiconify()
+            return
+        self.lyrics_window.show_window()
             
     def open_subtitle(self):
         """打开字幕文件"""
@@ -409,8 +450,9 @@ class MainWindow(tk.Tk):
             filetypes=[("字幕文件", "*.lrc;*.srt;*.vtt")]
         )
         if file_path:
+            # 只显示字幕, 播放结束后不再继续播放之前的播放列表
+            self.reset_playlist()
             # 隐藏主窗口
             self.withdraw()
             # 创建并显示歌词窗口,传入None作为音乐文件
-            lyrics_window = LyricsDisplay(None, self, subtitle_file=file_path)
-            lyrics_window.mainloop()
\ No newline at end of file
+            self.open_lyrics(None, subtitle_file=file_path)
\ No newline at end of file
@@ -0,0 +1,203 @@
+import mmap
+import os
+import re
+import weakref
+from array import array
+from collections import OrderedDict
+from itertools import islice
+from operator import le
+from lyric_timeline import LyricTimeline, split_words
+
+# 解码后的歌词保留多少句, 播放位置附近的几句够用了
+DECODE_CACHE_SIZE = 64
+
+# lrc 的一项: 时间戳(可能有多个)加歌词, 或者 [offset:+250] 这样的标签
+_LRC_ITEM = re.compile(
+    rb'\[(?:(\d+):(\d+(?:[.:]\d+)?)\]((?:[ \t]*\[\d+:\d+(?:[.:]\d+)?\])*)([^\r\n]*)'
+    rb'|([A-Za-z#]+):([^\]\r\n]*)\])')
+_LRC_TIME = re.compile(rb'\[(\d+):(\d+(?:[.:]\d+)?)\]')
+
+# srt/vtt 时间行的开始时间, 以及字幕块之间的空行
+_CUE_START = re.compile(rb'[ \t]*(?:(\d+):)?(\d{1,2}):(\d{1,2})[.,](\d{1,3})')
+_BLANK_LINE = re.compile(rb'\n[ \t\r]*\n')
+
+# vtt 的 <c>、<00:00:01.000> 等行内标签
+_VTT_TAG = re.compile(r'<[^>]*>')
+
+
+def _lrc_seconds(minutes, seconds):
+    return int(minutes) * 60 + float(seconds.replace(b':', b'.'))
+
+
+class _LazyTexts:
+    """按索引解码歌词文本, 代替 LyricTimeline.texts 列表
+
+    只保存时间轴的弱引用, 不形成循环引用, 时间轴不再使用时立即释放映射
+    """
+
+    def __init__(self, timeline):
+        self.timeline = weakref.proxy(timeline)
+
+    def __len__(self):
+        return len(self.timeline.times)
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        return self.timeline.line(index)[0]
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+
+class _LazyWords:
+    """按索引解码逐字时间, 代替 LyricTimeline.words 字典"""
+
+    def __init__(self, timeline):
+        self.timeline = weakref.proxy(timeline)
+
+    def get(self, index, default=None):
+        if not 0 <= index < len(self.timeline.times):
+            return default
+        words = self.timeline.line(index)[1]
+        return default if words is None else words
+
+    def __bool__(self):
+        return True
+
+
+class MappedTimeline(LyricTimeline):
+    """内存映射字幕文件的时间轴, 用于非常大的字幕文件
+
+    打开时扫描一遍文件, 只保存每句的开始时间、文本在文件中的偏移和长度
+    (每句 20 字节), 文本在用到时才从映射中解码, 并缓存最近用过的
+    DECODE_CACHE_SIZE 句。查询接口与 LyricTimeline 相同, 可以直接交给播放引擎
+    """
+
+    def __init__(self, path):
+        super().__init__()
+        self.path = path
+        ext = os.path.splitext(path)[1].lower()
+        self.lrc = ext not in ('.srt', '.vtt')
+        self.strip_tags = ext == '.vtt'
+        self.offset = 0.0
+
+        self.starts = array('q')
+        self.lengths = array('I')
+        self.cache = OrderedDict()
+
+        self.file = open(path, 'rb')
+        if os.fstat(self.file.fileno()).st_size:
+            self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            self.data = b''  # 空文件不能映射
+        if self.lrc:
+            self._scan_lrc()
+        else:
+            self._scan_cues()
+        self._sort()
+
+        self.texts = _LazyTexts(self)
+        self.words = _LazyWords(self)
+
+    def _scan_lrc(self):
+        times = self.times
+        starts = self.starts
+        lengths = self.lengths
+        for match in _LRC_ITEM.finditer(self.data):
+            minutes, seconds, more, text, key, value = match.groups()
+            if key:
+                key = key.decode('utf-8', 'replace').lower()
+                value = value.decode('utf-8', 'replace').strip()
+                if key == 'offset':
+                    try:
+                        self.offset = int(value) / 1000
+                    except ValueError:
+                        pass
+                else:
+                    self.metadata[key] = value
+                continue
+            start, end = match.span(4)
+            times.append(_lrc_seconds(minutes, seconds))
+            starts.append(start)
+            lengths.append(end - start)
+            # 多个时间戳共用一句歌词
+            for minutes, seconds in _LRC_TIME.findall(more):
+                times.append(_lrc_seconds(minutes, seconds))
+                starts.append(start)
+                lengths.append(end - start)
+        if self.offset:
+            # 正的 offset 表示歌词提前显示
+            self.times = array('d', (max(0.0, t - self.offset) for t in times))
+
+    def _scan_cues(self):
+        """扫描 srt/vtt: 找到 '-->' 所在的时间行, 文本到下一个空行为止"""
+        data = self.data
+        size = len(data)
+        pos = 0
+        while True:
+            arrow = data.find(b'-->', pos)
+            if arrow < 0:
+                break
+            line_start = data.rfind(b'\n', 0, arrow) + 1
+            line_end = data.find(b'\n', arrow)
+            if line_end < 0:
+                line_end = size
+            blank = _BLANK_LINE.search(data, line_end)
+            text_end = blank.start() if blank else size
+            pos = blank.end() if blank else size
+
+            match = _CUE_START.match(data, line_start, arrow)
+            if match is None:
+                continue  # NOTE 等块中的 '-->'
+            hh, mm, ss, ms = match.groups()
+            self.times.append(int(hh or 0) * 3600 + int(mm) * 60 + int(ss) + int(ms.ljust(3, b'0')) / 1000)
+            start = min(line_end + 1, text_end)
+            self.starts.append(start)
+            self.lengths.append(text_end - start)
+
+    def _sort(self):
+        times = self.times
+        if all(map(le, times, islice(times, 1, None))):
+            return
+        order = sorted(range(len(times)), key=times.__getitem__)
+        self.times = array('d', map(times.__getitem__, order))
+        self.starts = array('q', map(self.starts.__getitem__, order))
+        self.lengths = array('I', map(self.lengths.__getitem__, order))
+
+    def line(self, index):
+        """第 index 句的 (文本, 逐字时间或 None), 最近用过的几句缓存起来"""
+        cached = self.cache.get(index)
+        if cached is not None:
+            self.cache.move_to_end(index)
+            return cached
+
+        start = self.starts[index]
+        raw = self.data[start:start + self.lengths[index]].decode('utf-8', 'replace')
+        words = None
+        if self.lrc:
+            text = raw.strip()
+            if '<' in text:
+                text, words = split_words(text, self.times[index] + self.offset)
+                if words and self.offset:
+                    words = tuple((max(0.0, t - self.offset), word) for t, word in words)
+        else:
+            if self.strip_tags:
+                raw = _VTT_TAG.sub('', raw)
+            text = ' '.join(line.strip() for line in raw.splitlines() if line.strip())
+
+        cached = self.cache[index] = (text, words)
+        if len(self.cache) > DECODE_CACHE_SIZE:
+            self.cache.popitem(last=False)
+        return cached
+
+    def source_texts(self):
+        raise TypeError("MappedTimeline 不能写入字幕缓存")
+
+    def close(self):
+        self.cache.clear()
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+        self.file.close()
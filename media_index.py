@@ -0,0 +1,63 @@
+import os
+import sqlite3
+from config_manager import get_cache_dir
+
+
+class MediaIndex:
+    """本地媒体信息索引 (SQLite, WAL 模式)
+
+    按路径保存时长、显示名称和字幕路径, 同时记录文件大小和修改时间,
+    两者都没有变化时直接复用时长和显示名称, 不再读取音频文件。
+    字幕可能在音乐文件之后添加, 字幕路径只是上次的结果, 使用前要重新查找
+    """
+
+    def __init__(self, db_path=None):
+        if db_path is None:
+            db_path = os.path.join(get_cache_dir(), 'media_index.db')
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS media ("
+            " path TEXT PRIMARY KEY,"
+            " folder TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " mtime_ns INTEGER NOT NULL,"
+            " duration REAL NOT NULL,"
+            " display_name TEXT NOT NULL,"
+            " subtitle_path TEXT)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS media_folder ON media (folder)")
+        self.conn.commit()
+
+    def lookup_folder(self, folder):
+        """返回文件夹下已索引的文件: {路径: (大小, 修改时间, 时长, 显示名称, 字幕路径)}"""
+        rows = self.conn.execute(
+            "SELECT path, size, mtime_ns, duration, display_name, subtitle_path"
+            " FROM media WHERE folder = ?", (os.path.normpath(folder),))
+        return {row[0]: row[1:] for row in rows}
+
+    def lookup(self, path, size, mtime_ns):
+        """文件未变化时返回 (时长, 显示名称, 字幕路径), 否则返回 None"""
+        row = self.conn.execute(
+            "SELECT duration, display_name, subtitle_path FROM media"
+            " WHERE path = ? AND size = ? AND mtime_ns = ?", (path, size, mtime_ns)).fetchone()
+        return row
+
+    def update(self, entries):
+        """批量写入 (路径, 大小, 修改时间, 时长, 显示名称, 字幕路径)"""
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO media"
+                " (path, folder, size, mtime_ns, duration, display_name, subtitle_path)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(path, os.path.normpath(os.path.dirname(path)), size, mtime_ns,
+                  duration, display_name, subtitle_path)
+                 for path, size, mtime_ns, duration, display_name, subtitle_path in entries])
+
+    def remove(self, paths):
+        """删除已不存在的文件记录"""
+        with self.conn:
+            self.conn.executemany("DELETE FROM media WHERE path = ?", [(path,) for path in paths])
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,266 @@
+import os
+import struct
+
+AUDIO_EXTENSIONS = ('.mp3', '.wav', '.flac', '.ogg')
+
+# MP3 码率表(kbps), 按 [MPEG1/MPEG2][层] 索引
+_MP3_BITRATES = {
+    (1, 1): (0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448),
+    (1, 2): (0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384),
+    (1, 3): (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    (2, 1): (0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256),
+    (2, 2): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+    (2, 3): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+_MP3_SAMPLE_RATES = {
+    3: (44100, 48000, 32000),    # MPEG1
+    2: (22050, 24000, 16000),    # MPEG2
+    0: (11025, 12000, 8000),     # MPEG2.5
+}
+
+# 查找帧头和 Ogg 页头时最多读取的字节数
+_SEARCH_SIZE = 64 * 1024
+# 没有 Xing/VBRI 头的 MP3, 开头这么多帧以及文件中间的帧码率相同时按固定码率计算
+_CBR_CHECK_FRAMES = 16
+
+
+def probe_duration(path):
+    """只读取文件头计算音频时长(秒), 不解码音频, 无法识别时抛出 ValueError"""
+    ext = os.path.splitext(path)[1].lower()
+    probe = _PROBES.get(ext)
+    if probe is None:
+        raise ValueError(f"不支持的格式: {path}")
+    with open(path, 'rb') as f:
+        try:
+            return probe(f)
+        except (struct.error, IndexError) as e:
+            # 文件头被截断
+            raise ValueError(f"文件头不完整: {path}") from e
+
+
+def _file_size(f):
+    return os.fstat(f.fileno()).st_size
+
+
+def _wav_duration(f):
+    """RIFF: 从 fmt 块取每秒字节数, 从 data 块取数据长度"""
+    header = f.read(12)
+    if len(header) < 12 or header[:4] != b'RIFF' or header[8:12] != b'WAVE':
+        raise ValueError("不是有效的 WAV 文件")
+    byte_rate = None
+    while True:
+        chunk = f.read(8)
+        if len(chunk) < 8:
+            raise ValueError("WAV 文件缺少 data 块")
+        chunk_id, size = struct.unpack('<4sI', chunk)
+        if chunk_id == b'fmt ':
+            fmt = f.read(size)
+            if len(fmt) < 16:
+                raise ValueError("WAV fmt 块不完整")
+            byte_rate = struct.unpack_from('<I', fmt, 8)[0]
+            if size % 2:
+                f.seek(1, os.SEEK_CUR)
+        elif chunk_id == b'data':
+            if not byte_rate:
+                raise ValueError("WAV 文件缺少 fmt 块")
+            # 流式录音的 data 长度可能未填写, 按文件剩余长度计算
+            remaining = _file_size(f) - f.tell()
+            if size == 0 or size > remaining:
+                size = remaining
+            return size / byte_rate
+        else:
+            f.seek(size + size % 2, os.SEEK_CUR)
+
+
+def _parse_mp3_header(data, offset=0):
+    """解析 4 字节帧头, 返回 (帧长度, 每帧采样数, 采样率, 版本, 声道模式, 码率), 无效返回 None"""
+    if len(data) < offset + 4:
+        return None
+    b1, b2, b3 = data[offset + 1], data[offset + 2], data[offset + 3]
+    if data[offset] != 0xFF or (b1 & 0xE0) != 0xE0:
+        return None
+    version_bits = (b1 >> 3) & 0x03
+    layer_bits = (b1 >> 1) & 0x03
+    bitrate_index = b2 >> 4
+    rate_index = (b2 >> 2) & 0x03
+    if version_bits == 1 or layer_bits == 0 or bitrate_index in (0, 15) or rate_index == 3:
+        return None
+    layer = 4 - layer_bits
+    version = 1 if version_bits == 3 else 2
+    bitrate = _MP3_BITRATES[(version, layer)][bitrate_index] * 1000
+    sample_rate = _MP3_SAMPLE_RATES[version_bits][rate_index]
+    padding = (b2 >> 1) & 0x01
+    if layer == 1:
+        samples = 384
+        frame_length = (12 * bitrate // sample_rate + padding) * 4
+    elif layer == 3 and version == 2:
+        samples = 576
+        frame_length = 72 * bitrate // sample_rate + padding
+    else:
+        samples = 1152
+        frame_length = 144 * bitrate // sample_rate + padding
+    return frame_length, samples, sample_rate, version, b3 >> 6, bitrate
+
+
+def _find_mp3_frame(data):
+    """查找第一个有效帧, 要求下一帧紧接着也是有效帧头, 避免误判, 返回 (偏移, 帧头)"""
+    offset = data.find(b'\xff')
+    while offset != -1:
+        header = _parse_mp3_header(data, offset)
+        if header:
+            following = _parse_mp3_header(data, offset + header[0])
+            if following or offset + header[0] + 4 > len(data):
+                return offset, header
+        offset = data.find(b'\xff', offset + 1)
+    return -1, None
+
+
+def _skip_id3v2(f):
+    header = f.read(10)
+    if len(header) == 10 and header[:3] == b'ID3':
+        size = 0
+        for byte in header[6:10]:
+            size = (size << 7) | (byte & 0x7F)
+        if header[5] & 0x10:
+            size += 10    # footer
+        f.seek(10 + size)
+    else:
+        f.seek(0)
+
+
+def _mp3_duration(f):
+    """优先读取 Xing/Info 或 VBRI 头中的总帧数, 固定码率时按文件大小计算,
+    都不是时逐帧跳读帧头计数"""
+    _skip_id3v2(f)
+    start = f.tell()
+    data = f.read(_SEARCH_SIZE)
+
+    offset, header = _find_mp3_frame(data)
+    if not header:
+        raise ValueError("找不到 MP3 帧")
+    frame_length, samples, sample_rate, version, mode, bitrate = header
+
+    # Xing/Info 头在边信息之后
+    if version == 1:
+        side_info = 17 if mode == 3 else 32
+    else:
+        side_info = 9 if mode == 3 else 17
+    xing = offset + 4 + side_info
+    if data[xing:xing + 4] in (b'Xing', b'Info'):
+        flags = struct.unpack_from('>I', data, xing + 4)[0]
+        if flags & 0x01:
+            frames = struct.unpack_from('>I', data, xing + 8)[0]
+            return frames * samples / sample_rate
+    vbri = offset + 4 + 32
+    if data[vbri:vbri + 4] == b'VBRI':
+        frames = struct.unpack_from('>I', data, vbri + 14)[0]
+        return frames * samples / sample_rate
+
+    size = _file_size(f)
+    duration = _cbr_duration(f, data, offset, bitrate, start + offset, size)
+    if duration is not None:
+        return duration
+
+    # 没有头的可变码率文件才逐帧跳读, 每次只读 4 字节帧头
+    frames = 0
+    duration = 0.0
+    pos = start + offset
+    while pos + 4 <= size:
+        f.seek(pos)
+        header = _parse_mp3_header(f.read(4))
+        if not header:
+            break
+        frames += 1
+        duration += header[1] / header[2]
+        pos += header[0]
+    if not frames:
+        raise ValueError("找不到 MP3 帧")
+    return duration
+
+
+def _cbr_duration(f, data, offset, bitrate, audio_start, size):
+    """开头几帧和文件中间一帧的码率都相同时, 按 音频字节数 * 8 / 码率 计算, 否则返回 None"""
+    pos = offset
+    for _ in range(_CBR_CHECK_FRAMES):
+        header = _parse_mp3_header(data, pos)
+        if not header or header[5] != bitrate:
+            return None  # 可变码率, 或文件太短, 逐帧计数也很快
+        pos += header[0]
+
+    audio_end = size
+    if size >= 128:
+        f.seek(size - 128)
+        if f.read(3) == b'TAG':
+            audio_end -= 128    # ID3v1 标签
+    middle = audio_start + (audio_end - audio_start) // 2
+    f.seek(middle)
+    _, header = _find_mp3_frame(f.read(4096))
+    if not header or header[5] != bitrate:
+        return None
+    return (audio_end - audio_start) * 8 / bitrate
+
+
+def _flac_duration(f):
+    """STREAMINFO 块中的采样率和总采样数"""
+    _skip_id3v2(f)
+    if f.read(4) != b'fLaC':
+        raise ValueError("不是有效的 FLAC 文件")
+    block_header = f.read(4)
+    if len(block_header) < 4 or block_header[0] & 0x7F != 0:
+        raise ValueError("FLAC 文件缺少 STREAMINFO")
+    info = f.read(34)
+    if len(info) < 34:
+        raise ValueError("FLAC STREAMINFO 不完整")
+    # 采样率 20 位, 声道 3 位, 位深 5 位, 总采样数 36 位
+    packed = int.from_bytes(info[10:18], 'big')
+    sample_rate = packed >> 44
+    total_samples = packed & 0xFFFFFFFFF
+    if not sample_rate:
+        raise ValueError("FLAC 采样率无效")
+    return total_samples / sample_rate
+
+
+def _ogg_duration(f):
+    """首页的编码头给出采样率, 末页的 granule position 给出总采样数"""
+    head = f.read(_SEARCH_SIZE)
+    if head[:4] != b'OggS':
+        raise ValueError("不是有效的 Ogg 文件")
+    # 第一页只有一个包: 页头 27 字节 + 分段表
+    segments = head[26]
+    packet = head[27 + segments:]
+    pre_skip = 0
+    if packet[:7] == b'\x01vorbis':
+        sample_rate = struct.unpack_from('<I', packet, 12)[0]
+    elif packet[:8] == b'OpusHead':
+        sample_rate = 48000
+        pre_skip = struct.unpack_from('<H', packet, 10)[0]
+    else:
+        raise ValueError("不支持的 Ogg 编码")
+    if not sample_rate:
+        raise ValueError("Ogg 采样率无效")
+
+    # 从文件末尾向前查找最后一个有效页
+    size = _file_size(f)
+    end = size
+    while end > 0:
+        start = max(0, end - _SEARCH_SIZE)
+        f.seek(start)
+        # 多读 27 字节, 保证跨块边界的页头完整
+        tail = f.read(end - start + 27)
+        pos = tail.rfind(b'OggS', 0, end - start + 3)
+        while pos != -1:
+            if pos + 14 <= len(tail) and tail[pos + 4] == 0:
+                granule = struct.unpack_from('<q', tail, pos + 6)[0]
+                if granule >= 0:
+                    return max(0, granule - pre_skip) / sample_rate
+            pos = tail.rfind(b'OggS', 0, pos)
+        end = start
+    raise ValueError("找不到 Ogg 末页")
+
+
+_PROBES = {
+    '.wav': _wav_duration,
+    '.mp3': _mp3_duration,
+    '.flac': _flac_duration,
+    '.ogg': _ogg_duration,
+}
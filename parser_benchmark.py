@@ -0,0 +1,307 @@
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+import lrc_srt_convert
+import vtt2srt
+from lyric_timeline import LyricTimeline
+from mapped_timeline import MappedTimeline
+from subtitle_loader import load_subtitle, parse_lrc
+
+# 默认测试的字幕条数, 可用 --sizes 指定到 1000000
+SIZES = (100, 1000, 10000, 100000)
+
+# 每句歌词间隔(秒)
+CUE_INTERVAL = 2.5
+
+_WORDS = ("星", "光", "落", "在", "你", "的", "窗", "前", "lyric", "night")
+
+
+def _line_text(i):
+    return f"第{i}句 " + " ".join(_WORDS[(i + k) % len(_WORDS)] for k in range(6))
+
+
+def _lrc_time(seconds):
+    minutes, seconds = divmod(seconds, 60)
+    return f"{int(minutes):02d}:{seconds:05.2f}"
+
+
+def _cue_time(seconds, separator):
+    ms = int(round(seconds * 1000))
+    hours, ms = divmod(ms, 3600000)
+    minutes, ms = divmod(ms, 60000)
+    secs, ms = divmod(ms, 1000)
+    return f"{hours:02d}:{minutes:02d}:{secs:02d}{separator}{ms:03d}"
+
+
+def generate_lrc(count):
+    """生成 count 行 [mm:ss.xx]歌词"""
+    for i in range(count):
+        yield f"[{_lrc_time(i * CUE_INTERVAL)}]{_line_text(i)}\n"
+
+
+def generate_lrc_multi(count):
+    """生成 count 句歌词, 带 [ti:]/[ar:]/[offset:] 标签, CRLF 换行, 每行两个时间戳"""
+    yield "[ti:benchmark]\r\n[ar:lrc_player]\r\n[offset:+250]\r\n"
+    half = (count + 1) // 2
+    for i in range(half):
+        second = f"[{_lrc_time((i + half) * CUE_INTERVAL)}]" if i + half < count else ""
+        yield f"[{_lrc_time(i * CUE_INTERVAL)}]{second}{_line_text(i)}\r\n"
+
+
+def generate_srt(count):
+    """生成 count 个 SRT 字幕块"""
+    for i in range(count):
+        start = i * CUE_INTERVAL
+        yield (f"{i + 1}\n{_cue_time(start, ',')} --> {_cue_time(start + CUE_INTERVAL, ',')}\n"
+               f"{_line_text(i)}\n\n")
+
+
+def generate_vtt(count, karaoke=False):
+    """生成 count 个 VTT 字幕, karaoke 为真时每个词带时间标签和 <c> 标签"""
+    yield "WEBVTT\n\n"
+    for i in range(count):
+        start = i * CUE_INTERVAL
+        if karaoke:
+            step = CUE_INTERVAL / len(_WORDS)
+            text = " ".join(
+                f"<{_cue_time(start + k * step, '.')}><c>{_WORDS[(i + k) % len(_WORDS)]}</c>"
+                for k in range(len(_WORDS)))
+        else:
+            text = _line_text(i)
+        yield f"{_cue_time(start, '.')} --> {_cue_time(start + CUE_INTERVAL, '.')}\n{text}\n\n"
+
+
+def write_subtitle(path, lines, bom=False):
+    """写入生成的字幕文件, 返回文件大小"""
+    with open(path, 'w', encoding='utf-8-sig' if bom else 'utf-8') as f:
+        f.writelines(lines)
+    return os.path.getsize(path)
+
+
+def _read_text(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+def legacy_parse_lrc(lines):
+    """改用正则扫描之前 subtitle_loader 中逐行 split 的 lrc 解析, 保留用于比较"""
+    for line in lines:
+        if line.strip():
+            try:
+                time_str, text = line.split(']')
+                time_str = time_str.strip('[')
+                if ':' in time_str:
+                    minutes, seconds = map(float, time_str.split(':'))
+                    yield minutes * 60 + seconds, text.strip()
+            except (ValueError, IndexError):
+                continue
+
+
+def _legacy_load_lrc(path):
+    with open(path, 'r', encoding='utf-8-sig') as f:
+        return LyricTimeline.from_pairs(legacy_parse_lrc(f))
+
+
+def _parse_lrc(path):
+    with open(path, 'r', encoding='utf-8-sig') as f:
+        return parse_lrc(f.read())
+
+
+def legacy_convert_load_lrc(path):
+    """改用 parse_lrc 之前 lrc_srt_convert 中读取 lrc 的代码, 保留用于比较"""
+    hh_list = []
+    mm_list = []
+    ss_list = []
+    mms_list = []
+    content_list = []
+    file = open(path, "r", encoding="utf-8")
+    sub = file.readlines()
+    sub[0] = sub[0][1:len(sub[0])+1]
+    file.close()
+    for n in sub:
+        n = n.strip(" ")
+        n = n.strip("[")
+        content = n.split("]")[1]
+        time = n.split("]")[0]
+        hh_list.append(str(int(time.split(':')[0])//60).rjust(2, '0'))
+        mm_list.append(str(int(time.split(':')[0]) % 60).rjust(2, '0'))
+        ss_list.append(str(time.split(':')[1].split('.')[0]).rjust(2, '0'))
+        mms_list.append(
+            str(time.split(':')[1].split('.')[1]).ljust(3, '0'))
+        content_list.append(content)
+    return [hh_list, mm_list, ss_list, mms_list, content_list]
+
+
+# 转换模块中的函数以双下划线命名, 只能通过 getattr 取得
+_convert_load = getattr(lrc_srt_convert, '__load_file')
+_convert_write = getattr(lrc_srt_convert, '__convert_file')
+
+# 测试项: (名称, 输入格式, 函数(输入路径, 输出目录))
+CASES = (
+    # lrc_srt_convert 读取 srt 和写入的代码没有改过, legacy 项只有读取 lrc 不同
+    ("legacy_convert_load_lrc", "lrc", lambda path, out: legacy_convert_load_lrc(path)),
+    ("legacy_convert_lrc_to_srt", "lrc",
+     lambda path, out: _convert_write(legacy_convert_load_lrc(path), os.path.join(out, "out.srt"))),
+    ("convert_load_lrc", "lrc", lambda path, out: _convert_load(path)),
+    ("convert_load_srt", "srt", lambda path, out: _convert_load(path)),
+    ("convert_lrc_to_srt", "lrc",
+     lambda path, out: lrc_srt_convert.convert(path, os.path.join(out, "out.srt"))),
+    ("convert_srt_to_lrc", "srt",
+     lambda path, out: lrc_srt_convert.convert(path, os.path.join(out, "out.lrc"))),
+    ("vtt_convert_content", "vtt", lambda path, out: vtt2srt.convertContent(_read_text(path))),
+    ("vtt_convert_content_karaoke", "vtt_karaoke",
+     lambda path, out: vtt2srt.convertContent(_read_text(path))),
+    ("vtt_to_srt_stream", "vtt", lambda path, out: vtt2srt.vtt_to_srt(path)),
+    ("legacy_parse_lrc", "lrc", lambda path, out: _legacy_load_lrc(path)),
+    ("parse_lrc", "lrc", lambda path, out: _parse_lrc(path)),
+    ("parse_lrc_multi", "lrc_multi", lambda path, out: _parse_lrc(path)),
+    ("load_subtitle_lrc", "lrc", lambda path, out: load_subtitle(path)),
+    ("load_subtitle_srt", "srt", lambda path, out: load_subtitle(path)),
+    ("load_subtitle_vtt", "vtt", lambda path, out: load_subtitle(path)),
+    ("load_subtitle_vtt_karaoke", "vtt_karaoke", lambda path, out: load_subtitle(path)),
+    ("mapped_timeline_lrc", "lrc", lambda path, out: MappedTimeline(path)),
+    ("mapped_timeline_srt", "srt", lambda path, out: MappedTimeline(path)),
+    ("mapped_timeline_vtt", "vtt", lambda path, out: MappedTimeline(path)),
+)
+
+_GENERATORS = {
+    "lrc": (".lrc", generate_lrc, True),    # 带 BOM, 检查解析时是否正确去掉
+    "lrc_multi": (".lrc", generate_lrc_multi, False),
+    "srt": (".srt", generate_srt, False),
+    "vtt": (".vtt", generate_vtt, False),
+    "vtt_karaoke": (".vtt", lambda count: generate_vtt(count, karaoke=True), False),
+}
+
+
+def _gc_collections():
+    return sum(stat["collections"] for stat in gc.get_stats())
+
+
+def measure(func, path, out_dir, repeat=3, memory=True):
+    """运行 func, 返回最快耗时, 以及 tracemalloc 测得的峰值内存和结果占用的内存、块数"""
+    best = float('inf')
+    collections = 0
+    for _ in range(repeat):
+        gc.collect()
+        before = _gc_collections()
+        start = time.perf_counter()
+        result = func(path, out_dir)
+        elapsed = time.perf_counter() - start
+        collections = _gc_collections() - before
+        best = min(best, elapsed)
+        del result
+    stats = {"seconds": best, "gc_collections": collections}
+
+    if memory:
+        gc.collect()
+        tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+        tracemalloc.reset_peak()
+        result = func(path, out_dir)
+        peak = tracemalloc.get_traced_memory()[1]
+        after = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+        del result
+        # 与运行前比较, 只统计解析期间新分配且仍被结果引用的内存
+        ignore = [tracemalloc.Filter(False, tracemalloc.__file__)]
+        diff = after.filter_traces(ignore).compare_to(before.filter_traces(ignore), 'filename')
+        stats["peak_bytes"] = peak
+        stats["result_bytes"] = sum(stat.size_diff for stat in diff)
+        stats["result_blocks"] = sum(stat.count_diff for stat in diff)
+    return stats
+
+
+def run_benchmark(sizes=SIZES, cases=None, repeat=3, memory=True):
+    selected = [case for case in CASES if not cases or case[0] in cases]
+    results = []
+    with tempfile.TemporaryDirectory(prefix="lrc_bench_") as work_dir:
+        for count in sizes:
+            inputs = {}
+            for fmt in {case[1] for case in selected}:
+                ext, generator, bom = _GENERATORS[fmt]
+                path = os.path.join(work_dir, f"{fmt}_{count}{ext}")
+                inputs[fmt] = (path, write_subtitle(path, generator(count), bom))
+
+            for name, fmt, func in selected:
+                path, size = inputs[fmt]
+                try:
+                    stats = measure(func, path, work_dir, repeat, memory)
+                except Exception as e:
+                    print(f"{name} ({count} 条) 失败: {e}")
+                    continue
+                seconds = stats["seconds"] or 1e-9
+                stats.update({
+                    "case": name,
+                    "format": fmt,
+                    "cues": count,
+                    "bytes": size,
+                    "cues_per_second": count / seconds,
+                    "mb_per_second": size / 1024 / 1024 / seconds,
+                })
+                results.append(stats)
+                _print_result(stats)
+    return {
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "repeat": repeat,
+        "results": results,
+    }
+
+
+def _print_result(stats):
+    line = (f"{stats['case']:<30} {stats['cues']:>8} 条 {stats['seconds'] * 1000:>10.2f} ms "
+            f"{stats['cues_per_second']:>12.0f} cues/s {stats['mb_per_second']:>8.2f} MB/s")
+    if "peak_bytes" in stats:
+        line += (f"  峰值 {stats['peak_bytes'] / 1024 / 1024:.2f} MB"
+                 f"  结果 {stats['result_bytes'] / 1024 / 1024:.2f} MB / {stats['result_blocks']} 块")
+    print(line)
+
+
+def compare(report, baseline):
+    """与之前保存的结果比较, 打印耗时变化"""
+    previous = {(r["case"], r["cues"]): r for r in baseline["results"]}
+    print(f"与 {baseline.get('created', '之前的结果')} 比较 (耗时比, <1 表示变快):")
+    for result in report["results"]:
+        old = previous.get((result["case"], result["cues"]))
+        if old and old["seconds"]:
+            ratio = result["seconds"] / old["seconds"]
+            print(f"  {result['case']:<30} {result['cues']:>8} 条 {ratio:>6.2f}x")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="用生成的字幕测试各解析器和转换器的性能")
+    parser.add_argument("-s", "--sizes", default=",".join(map(str, SIZES)),
+                        help="字幕条数, 逗号分隔 (默认 %(default)s, 最大可到 1000000)")
+    parser.add_argument("-c", "--case", action="append", choices=[case[0] for case in CASES],
+                        help="只运行指定的测试项, 可重复")
+    parser.add_argument("-n", "--repeat", type=int, default=3, help="每项重复次数, 取最快一次 (默认 3)")
+    parser.add_argument("--no-memory", action="store_true", help="不使用 tracemalloc 测量内存")
+    parser.add_argument("-o", "--output", help="把结果保存为 JSON 文件")
+    parser.add_argument("--compare", help="与之前保存的 JSON 结果比较")
+    args = parser.parse_args(argv)
+
+    try:
+        sizes = [int(size) for size in args.sizes.split(",")]
+    except ValueError:
+        parser.error(f"无效的条数: {args.sizes}")
+
+    report = run_benchmark(sizes, args.case, max(1, args.repeat), not args.no_memory)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=4, ensure_ascii=False)
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            compare(report, json.load(f))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,126 @@
+import time
+
+
+class PlaybackClock:
+    """以单调高精度计数器为基础的播放时钟
+
+    播放位置由 time.perf_counter 推算, 不受系统时间调整影响。
+    设置了 audio_position 时, 每隔 discipline_interval 秒用音频设备
+    报告的位置校准一次: 小偏差通过微调走速(slew)平滑修正,
+    时钟落后太多时直接向前跳, 超前太多时停住等待音频追上,
+    任何情况下都不会倒退。stats 为 instrumentation.Instrumentation 时
+    每次校准的偏差记录为 "clock_drift"
+    """
+
+    def __init__(self, audio_position=None, time_source=time.perf_counter,
+                 discipline_interval=1.0, max_slew=0.05, step_threshold=0.5, stats=None):
+        self.audio_position = audio_position
+        self.time_source = time_source
+        self.stats = stats
+        self.discipline_interval = discipline_interval
+        self.max_slew = max_slew
+        self.step_threshold = step_threshold
+
+        self.seek_offset = 0.0
+        self.base_pos = 0.0
+        self.base_time = time_source()
+        self.rate = 1.0
+        self.is_paused = False
+        self.last_pos = 0.0
+        self.last_discipline = self.base_time
+
+        # 偏差统计(时钟位置 - 音频位置, 秒)
+        self.drift = 0.0
+        self.max_drift = 0.0
+        self.drift_sum = 0.0
+        self.drift_samples = 0
+
+    def _position(self, t):
+        if self.is_paused:
+            return self.base_pos
+        return self.base_pos + (t - self.base_time) * self.rate
+
+    def _rebase(self, t, pos):
+        self.base_pos = pos
+        self.base_time = t
+
+    def now(self):
+        """返回当前播放位置(秒), 到期时先用音频位置校准"""
+        t = self.time_source()
+        if (not self.is_paused and self.audio_position is not None
+                and t - self.last_discipline >= self.discipline_interval):
+            self.discipline(t)
+        pos = max(self._position(t), self.last_pos)
+        self.last_pos = pos
+        return pos
+
+    def seek(self, pos, audio_offset=None):
+        """跳转到 pos 秒
+
+        audio_offset 是音频设备位置计数为 0 时对应的播放位置, 默认等于 pos
+        """
+        t = self.time_source()
+        self.seek_offset = pos if audio_offset is None else audio_offset
+        self._rebase(t, pos)
+        self.rate = 1.0
+        self.last_pos = pos
+        self.last_discipline = t
+
+    def pause(self):
+        if self.is_paused:
+            return
+        t = self.time_source()
+        self._rebase(t, max(self._position(t), self.last_pos))
+        self.is_paused = True
+
+    def resume(self):
+        if not self.is_paused:
+            return
+        t = self.time_source()
+        self.is_paused = False
+        self._rebase(t, self.base_pos)
+        self.last_discipline = t
+
+    def discipline(self, t=None):
+        """用音频设备位置校准时钟, 返回本次测得的偏差(秒)"""
+        if t is None:
+            t = self.time_source()
+        self.last_discipline = t
+        audio_pos = self.audio_position()
+        if audio_pos is None:
+            return None
+
+        pos = max(self._position(t), self.last_pos)
+        drift = pos - audio_pos
+        self.drift = drift
+        self.max_drift = max(self.max_drift, abs(drift))
+        self.drift_sum += abs(drift)
+        self.drift_samples += 1
+        if self.stats is not None:
+            self.stats.record("clock_drift", abs(drift) * 1000)
+
+        self._rebase(t, pos)
+        if drift < -self.step_threshold:
+            # 时钟落后太多(例如系统卡顿), 直接向前跳到音频位置
+            self._rebase(t, audio_pos)
+            self.last_pos = audio_pos
+            self.rate = 1.0
+        elif drift > self.step_threshold:
+            # 时钟超前太多(例如混音器停顿), 停住等待音频追上
+            self.rate = 0.0
+        else:
+            # 在下一个校准周期内把偏差平滑消除
+            correction = -drift / self.discipline_interval
+            correction = max(-self.max_slew, min(self.max_slew, correction))
+            self.rate = 1.0 + correction
+        return drift
+
+    def drift_stats(self):
+        """返回偏差统计, 单位为毫秒"""
+        mean = self.drift_sum / self.drift_samples if self.drift_samples else 0.0
+        return {
+            "samples": self.drift_samples,
+            "last_ms": round(self.drift * 1000, 2),
+            "mean_abs_ms": round(mean * 1000, 2),
+            "max_abs_ms": round(self.max_drift * 1000, 2),
+        }
@@ -0,0 +1,479 @@
+import math
+import threading
+import time
+from audio_backend import AudioError
+from cue_scheduler import CueScheduler
+from lyric_timeline import LyricTimeline
+from playback_clock import PlaybackClock
+from seek_engine import SeekEngine
+
+# 最后一句歌词之后检查音乐是否播放完毕的间隔(毫秒)
+END_CHECK_INTERVAL = 500
+# 距离结束多少秒时预加载下一首歌(秒)
+PRELOAD_SECONDS = 15
+# 检查预加载是否完成的间隔(毫秒)
+PRELOAD_POLL_INTERVAL = 100
+# 距离结束多少秒开始检测切换到下一首(秒), 以及检测间隔(毫秒)
+BOUNDARY_LEAD = 0.5
+BOUNDARY_POLL_INTERVAL = 20
+
+
+class PlaybackEngine:
+    """歌词播放引擎, 不依赖 Tk 和 pygame
+
+    loop 提供 after/after_cancel/after_idle (Tk 控件或 headless.VirtualLoop),
+    audio 是音频后端(audio_backend 中的类), time_source 是播放时钟的时间来源,
+    view 是视图模型, 引擎只调用 view.set 修改 "lyric"/"time" 文本,
+    "words" (当前歌词的逐字时间和下一句的时间, 没有时为 None) 和 "paused"。
+    host 提供播放列表相关的操作:
+        load_lyrics(字幕路径) -> LyricTimeline
+        find_subtitle(音乐路径) -> 字幕路径或 None
+        get_track_duration(音乐路径) -> 秒或 None
+        get_next_track() -> (音乐路径, 字幕路径或 None) 或 None
+        on_track_switched(音乐路径)    无缝切换到下一首之后调用
+        on_track_finished()            歌曲播放完毕且没有无缝切换时调用
+    threaded_preload 为 False 时在定时器中同步预加载, 使测试结果可重复
+    """
+
+    def __init__(self, loop, audio, host, view, stats, time_source=time.perf_counter,
+                 threaded_preload=True):
+        self.loop = loop
+        self.audio = audio
+        self.host = host
+        self.view = view
+        self.stats = stats
+        self.time_source = time_source
+        self.threaded_preload = threaded_preload
+        self.volume = 0.5
+
+        # 当前歌曲的状态, 由 load_track 设置
+        self.lyrics = LyricTimeline()
+        self.current_index = 0
+        self.is_paused = False
+        self.music_file = None
+
+        # 播放时钟, 音乐模式下用音频后端的播放位置校准
+        self.clock = PlaybackClock(time_source=time_source)
+
+        # 合并连续的跳转请求
+        self.seek_engine = SeekEngine(loop, self.get_current_time, self.seek_audio)
+        # 时钟已跳转而音频还没跳转时, 音频实际所在位置对应的 seek_offset
+        self.audio_offset = None
+
+        # 预加载下一首歌: 结束前在后台解析字幕并加入播放队列,
+        # 播放到边界时直接切换歌词
+        self.track_duration = None
+        self.next_track = None
+        self.preload_thread = None
+        self.preload_result = None
+        # 已加入音频队列但从播放列表中删除的文件, 播放到它时结束当前歌曲
+        self.dropped_track = None
+        self.last_audio_ms = 0
+
+        # 歌词在下一句的时间点刷新，时间标签每秒刷新
+        self.lyric_scheduler = CueScheduler(loop, self.get_current_time, self.on_lyric_timer)
+        self.clock_scheduler = CueScheduler(loop, self.get_current_time, self.update_time_label)
+        self.track_scheduler = CueScheduler(loop, self.get_current_time, self.on_track_timer)
+
+    def load_track(self, music_file, lyrics):
+        """开始播放一首歌, music_file 为 None 时只显示字幕"""
+        self.stop_timers()
+        if self.lyrics is not lyrics:
+            self.lyrics.close()
+        self.discard_next_track()
+        self.lyrics = lyrics
+        self.current_index = 0
+        self.is_paused = False
+        self.music_file = music_file
+        self.clear_line()
+
+        self.audio_offset = None
+        self.last_audio_ms = 0
+        self.clock = PlaybackClock(self.get_audio_position if music_file else None,
+                                   time_source=self.time_source, stats=self.stats)
+
+        # 如果有音乐文件则播放
+        if music_file:
+            self.audio.init()
+            self.audio.set_volume(self.volume)
+            self.audio.load(music_file)
+            self.audio.play()
+        self.clock.seek(0)
+        self.track_duration = self.host.get_track_duration(music_file) if music_file else None
+
+        self.loop.after_idle(self.reschedule)
+
+    def stop_timers(self):
+        """取消当前歌曲的所有定时器"""
+        self.lyric_scheduler.cancel()
+        self.clock_scheduler.cancel()
+        self.track_scheduler.cancel()
+        self.seek_engine.cancel()
+
+    def discard_next_track(self):
+        """丢弃预加载的下一首并关闭它的时间轴, 后台还没完成的预加载结果也会被忽略"""
+        if self.next_track:
+            self.next_track[1].close()
+        self.next_track = None
+        self.preload_thread = None
+        self.preload_result = None
+        self.dropped_track = None
+
+    def forget_next_track(self, paths):
+        """播放列表中的 paths 被删除或改名后调用
+
+        预加载的下一首在其中时按播放列表重新选择。已经加入音频队列的文件
+        不能取消, 在后台预加载新的下一首替换它; 没有下一首时让它留在队列中,
+        播放到边界时再停止, 不打断当前歌曲
+        """
+        if not self.music_file:
+            return
+        if self.next_track:
+            pending = self.next_track[0]
+        else:
+            pending = (self.preload_result or {}).get("music_file")
+        if pending is None or pending not in paths:
+            return
+        queued = self.next_track is not None
+        self.discard_next_track()
+        self.track_scheduler.cancel()
+        if queued:
+            self.dropped_track = pending
+            self.preload_next()
+        self.schedule_track_timer()
+
+    def stop(self):
+        """停止播放, 之后可以再 load_track"""
+        self.stop_timers()
+        self.discard_next_track()
+        if self.music_file:
+            try:
+                self.audio.stop()
+            except AudioError:
+                pass
+
+    def shutdown(self):
+        """退出程序前释放音频设备"""
+        self.stop_timers()
+        self.lyrics.close()
+        self.discard_next_track()
+        if self.music_file:
+            try:
+                self.audio.stop()
+                self.audio.quit()
+            except AudioError:
+                pass  # 忽略音频后端的错误
+
+    def set_volume(self, volume):
+        self.volume = max(0.0, min(1.0, volume))
+        if self.music_file:
+            self.audio.set_volume(self.volume)
+
+    def get_current_time(self):
+        return self.clock.now()
+
+    def get_audio_position(self):
+        """音频后端报告的播放位置(秒), get_pos 从最近一次 play 开始计时"""
+        if self.audio_offset is not None:
+            return None  # 音频还没跳转到时钟的位置, 暂不校准
+        pos = self.audio.get_pos()
+        if pos < 0:
+            return None
+        return self.clock.seek_offset + pos / 1000.0
+
+    def playback_stats(self):
+        """返回时钟偏差和跳转耗时统计, 纯字幕模式返回空字典"""
+        if not self.music_file:
+            return {}
+        return {"clock": self.clock.drift_stats(), "seek": self.seek_engine.stats()}
+
+    def on_lyric_timer(self):
+        """歌词定时器触发, 记录实际触发时间比预定时间晚了多少"""
+        target_time = self.lyric_scheduler.target_time
+        if target_time is not None:
+            self.stats.record("tick_jitter", (self.get_current_time() - target_time) * 1000)
+        with self.stats.timer("tick"):
+            self.update_lyric()
+
+    def update_lyric(self):
+        """显示当前歌词, 并把定时器安排到下一句歌词的时间点"""
+        if self.is_paused:
+            return
+        current_time = self.get_current_time()
+
+        # 二分查找当前时间对应的歌词，只有歌词变化时才更新标签
+        index = self.lyrics.position(current_time)
+        if index != self.current_index:
+            if index > 0:
+                self.show_line(index - 1)
+            self.current_index = index
+
+        # 还有歌词则在下一句歌词的时间点再触发
+        if self.current_index < len(self.lyrics):
+            self.lyric_scheduler.schedule_at(self.lyrics.times[self.current_index])
+            return
+
+        # 检查是否播放完毕
+        # 如果是音乐模式，等待音乐播放完毕
+        if self.music_file and self.audio.get_busy():
+            self.lyric_scheduler.schedule_in(END_CHECK_INTERVAL)
+            return
+
+        # 音乐播放完毕或纯字幕模式，直接结束
+        self.clock_scheduler.cancel()
+        self.host.on_track_finished()
+
+    def show_line(self, index):
+        """显示第 index 句歌词, 有逐字时间时一并交给视图做卡拉OK高亮"""
+        self.view.set("lyric", self.lyrics.texts[index])
+        words = self.lyrics.words.get(index)
+        if words:
+            end_time = self.lyrics.times[index + 1] if index + 1 < len(self.lyrics) else None
+            self.view.set("words", (words, end_time))
+        else:
+            self.view.set("words", None)
+
+    def clear_line(self):
+        self.view.set("lyric", "")
+        self.view.set("words", None)
+        self.view.set("paused", False)
+
+    def update_time_label(self):
+        """时间标签定时器回调: 每到整秒更新一次 mm:ss"""
+        if self.is_paused:
+            return
+        current_time = self.get_current_time()
+
+        # 将时间格式化为分钟:秒
+        minutes = int(current_time // 60)
+        seconds = int(current_time % 60)
+        self.view.set("time", f"{minutes:02}:{seconds:02}")
+
+        self.clock_scheduler.schedule_at(math.floor(current_time) + 1)
+
+    def reschedule(self):
+        """跳转、暂停或继续播放后重新安排歌词和时间定时器"""
+        if self.is_paused:
+            self.lyric_scheduler.cancel()
+            self.clock_scheduler.cancel()
+            self.track_scheduler.cancel()
+            return
+        self.update_lyric()
+        self.update_time_label()
+        self.schedule_track_timer()
+
+    def schedule_track_timer(self):
+        """安排预加载下一首或检测切换的定时器"""
+        if not self.music_file or not self.track_duration:
+            return
+        if self.next_track or self.dropped_track:
+            self.track_scheduler.schedule_at(self.track_duration - BOUNDARY_LEAD)
+        elif self.preload_result is None:
+            self.track_scheduler.schedule_at(self.track_duration - PRELOAD_SECONDS)
+
+    def on_track_timer(self):
+        if self.next_track or self.dropped_track:
+            self.check_track_switch()
+        else:
+            self.preload_next()
+
+    def preload_next(self):
+        """查找并解析下一首歌的字幕"""
+        if self.preload_result is not None:
+            return
+        track = self.host.get_next_track()
+        if track is None:
+            return
+        music_file, subtitle_file = track
+        self.preload_result = {"music_file": music_file}
+        if not self.threaded_preload:
+            self.preload_worker(music_file, subtitle_file, self.preload_result)
+            self.finish_preload(self.preload_result)
+            return
+        self.preload_thread = threading.Thread(
+            target=self.preload_worker, args=(music_file, subtitle_file, self.preload_result), daemon=True)
+        self.preload_thread.start()
+        self.loop.after(PRELOAD_POLL_INTERVAL, self.check_preload, self.preload_thread)
+
+    def preload_worker(self, music_file, subtitle_file, result):
+        # 可能在后台线程中运行, 不能访问 Tk 控件
+        try:
+            subtitle_file = subtitle_file or self.host.find_subtitle(music_file)
+            if subtitle_file:
+                with self.stats.timer("subtitle_load"):
+                    result["lyrics"] = self.host.load_lyrics(subtitle_file)
+                result["duration"] = self.host.get_track_duration(music_file)
+        except Exception as e:
+            print(f"预加载下一首失败: {e}")
+
+    def check_preload(self, thread):
+        if thread is not self.preload_thread:
+            # 已经换歌, 丢弃旧的预加载结果
+            return
+        if thread.is_alive():
+            self.loop.after(PRELOAD_POLL_INTERVAL, self.check_preload, thread)
+            return
+        self.finish_preload(self.preload_result)
+
+    def finish_preload(self, result):
+        """预加载完成后把下一首加入播放队列"""
+        if "lyrics" not in result:
+            # 找不到字幕, 播放结束后按原来的方式打开下一首
+            return
+        try:
+            self.audio.queue(result["music_file"])
+        except AudioError as e:
+            print(f"无法加入播放队列: {e}")
+            return
+        self.next_track = (result["music_file"], result["lyrics"], result["duration"])
+        # 新的下一首替换了队列中被删除的文件
+        self.dropped_track = None
+        self.last_audio_ms = max(self.last_audio_ms, self.audio.get_pos())
+        self.schedule_track_timer()
+
+    def check_track_switch(self):
+        """检测音频后端是否已开始播放队列中的下一首
+
+        切换时 get_pos 会从 0 重新计时, 所以位置变小就说明已到边界
+        """
+        pos = self.audio.get_pos()
+        if 0 <= pos < self.last_audio_ms:
+            if self.next_track:
+                self.switch_to_next_track(pos)
+            else:
+                self.finish_dropped_track()
+            return
+        self.last_audio_ms = max(self.last_audio_ms, pos)
+        if self.audio.get_busy():
+            self.track_scheduler.schedule_in(BOUNDARY_POLL_INTERVAL)
+
+    def switch_to_next_track(self, pos_ms):
+        """在边界处切换到已预加载的下一首, 时钟按音频位置对齐"""
+        music_file, lyrics, duration = self.next_track
+        self.next_track = None
+        self.preload_thread = None
+        self.preload_result = None
+
+        self.music_file = music_file
+        self.lyrics.close()
+        self.lyrics = lyrics
+        self.track_duration = duration
+        self.current_index = 0
+        self.clear_line()
+        self.host.on_track_switched(music_file)
+
+        # 上一首还没执行的跳转不再需要, get_pos 已从下一首的开头重新计时
+        self.seek_engine.cancel()
+        self.audio_offset = None
+        self.last_audio_ms = pos_ms
+        self.clock.seek(pos_ms / 1000.0, audio_offset=0.0)
+        self.reschedule()
+
+    def finish_dropped_track(self):
+        """队列中被删除的文件开始播放, 停止它并按播放完毕处理"""
+        self.discard_next_track()
+        self.stop_timers()
+        try:
+            self.audio.stop()
+        except AudioError:
+            pass
+        self.host.on_track_finished()
+
+    def update_display_after_time_change(self, new_time):
+        # 二分查找更新当前索引
+        self.current_index = self.lyrics.position(new_time)
+
+        # 更新显示的歌词
+        if self.current_index > 0:
+            self.show_line(self.current_index - 1)
+
+        self.reschedule()
+
+    def toggle_pause(self):
+        if self.is_paused:
+            if self.music_file:
+                self.audio.unpause()
+            self.is_paused = False
+            self.clock.resume()
+        else:
+            if self.music_file:
+                self.audio.pause()
+            self.is_paused = True
+            self.clock.pause()
+        self.view.set("paused", self.is_paused)
+        self.reschedule()
+
+    def seek_by(self, delta):
+        """跳转 delta 秒: 时钟和歌词立即更新, 音频在按键停止后只跳转一次"""
+        with self.stats.timer("seek"):
+            new_time = max(0, self.get_current_time() + delta)
+            if self.music_file and self.track_duration:
+                # 不跳过结尾, 停在边界检测的位置, 由预加载的下一首无缝接上
+                new_time = min(new_time, max(0, self.track_duration - BOUNDARY_LEAD))
+            if self.music_file:
+                # 音频跳转成功后才更新 seek_offset, 失败时按原来的 offset 退回音频的位置
+                if self.audio_offset is None:
+                    self.audio_offset = self.clock.seek_offset
+                self.clock.seek(new_time, audio_offset=self.audio_offset)
+            else:
+                self.clock.seek(new_time)
+            self.update_display_after_time_change(new_time)
+            if self.music_file:
+                self.seek_engine.request()
+
+    def seek_audio(self, new_time):
+        """在已加载的音乐中跳转, 不重新打开文件"""
+        with self.stats.timer("seek_audio"):
+            start = new_time
+            try:
+                self.audio.play(start=new_time)
+            except AudioError:
+                # 当前解码器不支持直接跳转时才重新加载
+                try:
+                    start = self.reload_audio(new_time)
+                except AudioError as e:
+                    print(f"跳转失败: {e}")
+                    self.restore_audio_position()
+                    return
+            self.audio_offset = None
+            if self.is_paused:
+                self.audio.pause()
+            self.last_audio_ms = 0
+            self.clock.seek(start)
+            if start != new_time:
+                # 只能从头播放, 歌词和时间跟着回到开头
+                self.update_display_after_time_change(start)
+            else:
+                self.schedule_track_timer()
+
+    def restore_audio_position(self):
+        """音频跳转失败, 时钟和歌词回到音频实际播放的位置"""
+        offset, self.audio_offset = self.audio_offset, None
+        try:
+            pos = self.audio.get_pos()
+        except AudioError:
+            return
+        if offset is None or pos < 0:
+            return  # 音频已停止, 播放到结尾后按正常流程结束
+        position = offset + pos / 1000.0
+        self.clock.seek(position, audio_offset=offset)
+        self.update_display_after_time_change(position)
+
+    def reload_audio(self, new_time):
+        """重新打开音乐并从 new_time 秒开始播放, 仍然不能跳转时从头播放, 返回实际开始的位置
+
+        重新加载会清空播放队列, 预加载的下一首重新加入队列
+        """
+        self.audio.stop()
+        self.audio.load(self.music_file)
+        try:
+            self.audio.play(start=new_time)
+        except AudioError as e:
+            print(f"无法跳转到 {new_time:.1f} 秒, 从头播放: {e}")
+            self.audio.play()
+            new_time = 0.0
+        if self.next_track:
+            self.audio.queue(self.next_track[0])
+        # 重新加载清空了播放队列, 被删除的文件不会再播放
+        self.dropped_track = None
+        return new_time
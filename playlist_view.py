@@ -0,0 +1,196 @@
+import math
+import tkinter as tk
+from tkinter import ttk
+
+# 可见行之外额外创建的行数
+OVERSCAN = 2
+
+
+class VirtualPlaylist(tk.Frame):
+    """虚拟化的播放列表
+
+    数据保存在 Python 侧, 由 row_source(索引) 返回一行的值,
+    Treeview 中只创建可见行加少量额外行, 滚动时改写这些行的内容,
+    所以滚动、排序和清空的开销与曲目数量无关
+    """
+
+    def __init__(self, master, columns, row_source, on_activate=None, on_sort=None, **kwargs):
+        super().__init__(master, **kwargs)
+        self.columns = columns
+        self.row_source = row_source
+        self.on_activate = on_activate
+        self.on_sort = on_sort
+
+        self.count = 0
+        self.first = 0
+        self.selected = None
+        self.items = []
+
+        self.scrollbar = ttk.Scrollbar(self, command=self.yview)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+        self.tree = ttk.Treeview(self, columns=[c[0] for c in columns], show="headings",
+                                 selectmode="browse")
+        for column, text, width, anchor in columns:
+            self.tree.heading(column, text=text, command=lambda c=column: self._sort(c))
+            self.tree.column(column, width=width, anchor=anchor)
+
+        # 设置交替行颜色
+        self.tree.tag_configure('oddrow', background='#f9f9f9')
+        self.tree.tag_configure('evenrow', background='#ffffff')
+        self.tree.pack(fill=tk.BOTH, expand=True)
+
+        self.tree.bind("<Configure>", self._on_configure)
+        self.tree.bind("<ButtonPress-1>", self._on_click)
+        self.tree.bind("<Double-1>", self._on_double_click)
+        self.tree.bind("<Return>", self._on_return)
+        self.tree.bind("<MouseWheel>", self._on_mousewheel)
+        self.tree.bind("<Button-4>", lambda e: self._scroll_by(-3))
+        self.tree.bind("<Button-5>", lambda e: self._scroll_by(3))
+        self.tree.bind("<Up>", lambda e: self._move_selection(-1))
+        self.tree.bind("<Down>", lambda e: self._move_selection(1))
+        self.tree.bind("<Prior>", lambda e: self._move_selection(-self.visible_rows()))
+        self.tree.bind("<Next>", lambda e: self._move_selection(self.visible_rows()))
+        self.tree.bind("<Home>", lambda e: self._move_selection(-self.count))
+        self.tree.bind("<End>", lambda e: self._move_selection(self.count))
+
+    def row_height(self):
+        try:
+            return int(ttk.Style().lookup("Treeview", "rowheight")) or 20
+        except (ValueError, tk.TclError):
+            return 20
+
+    def visible_rows(self):
+        return max(1, math.ceil(self.tree.winfo_height() / self.row_height()))
+
+    def _clamp_first(self, first):
+        """第一行的合法范围, 最后一行可能只露出一部分, 所以允许多滚动一行"""
+        return max(0, min(first, self.count - self.visible_rows() + 1))
+
+    def set_count(self, count):
+        """数据行数变化后调用, 只重绘可见区域"""
+        self.count = count
+        if self.selected is not None and self.selected >= count:
+            self.selected = None
+        self.first = self._clamp_first(self.first)
+        self.render()
+
+    def refresh(self):
+        """数据内容变化(如排序)后重绘可见区域"""
+        self.render()
+
+    def clear(self):
+        self.selected = None
+        self.first = 0
+        self.set_count(0)
+
+    def selected_index(self):
+        return self.selected
+
+    def see(self, index):
+        """滚动使 index 行可见"""
+        visible = self.visible_rows()
+        if index < self.first:
+            self.first = index
+        elif index >= self.first + visible - 1:
+            self.first = index - visible + 2
+        self.first = self._clamp_first(self.first)
+        self.render()
+
+    def render(self):
+        # 创建或删除行, 使行数等于可见行数加额外行
+        wanted = min(self.visible_rows() + OVERSCAN, max(0, self.count - self.first))
+        while len(self.items) < wanted:
+            self.items.append(self.tree.insert("", "end"))
+        while len(self.items) > wanted:
+            self.tree.delete(self.items.pop())
+
+        selection = ()
+        for row, item in enumerate(self.items):
+            index = self.first + row
+            tag = 'evenrow' if index % 2 == 0 else 'oddrow'
+            self.tree.item(item, values=self.row_source(index), tags=(tag,))
+            if index == self.selected:
+                selection = (item,)
+        self.tree.selection_set(selection)
+        self.tree.yview_moveto(0)
+        self._update_scrollbar()
+
+    def _update_scrollbar(self):
+        if self.count:
+            visible = self.visible_rows()
+            self.scrollbar.set(self.first / self.count, min(1.0, (self.first + visible) / self.count))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    def yview(self, *args):
+        """滚动条回调"""
+        if args[0] == "moveto":
+            self._scroll_to(int(float(args[1]) * self.count))
+        elif args[0] == "scroll":
+            amount = int(args[1])
+            if args[2] == "pages":
+                amount *= max(1, self.visible_rows() - 1)
+            self._scroll_by(amount)
+
+    def _scroll_to(self, first):
+        first = self._clamp_first(first)
+        if first != self.first:
+            self.first = first
+            self.render()
+
+    def _scroll_by(self, amount):
+        self._scroll_to(self.first + amount)
+        return "break"
+
+    def _on_mousewheel(self, event):
+        return self._scroll_by(-3 if event.delta > 0 else 3)
+
+    def _on_configure(self, event):
+        # 窗口变高后可见行数增加, 保持最后一行仍在底部
+        self.first = self._clamp_first(self.first)
+        self.render()
+
+    def _index_at(self, y):
+        item = self.tree.identify_row(y)
+        if not item or item not in self.items:
+            return None
+        return self.first + self.items.index(item)
+
+    def _on_click(self, event):
+        if self.tree.identify_region(event.x, event.y) != "cell":
+            return None
+        index = self._index_at(event.y)
+        if index is not None:
+            self.selected = index
+            self.tree.focus_set()
+            self.render()
+        return "break"
+
+    def _on_double_click(self, event):
+        if self.tree.identify_region(event.x, event.y) != "cell":
+            return None
+        index = self._index_at(event.y)
+        if index is not None and self.on_activate:
+            self.selected = index
+            self.on_activate(index)
+        return "break"
+
+    def _on_return(self, event):
+        if self.selected is not None and self.on_activate:
+            self.on_activate(self.selected)
+        return "break"
+
+    def _move_selection(self, amount):
+        if not self.count:
+            return "break"
+        if self.selected is None:
+            self.selected = self.first
+        else:
+            self.selected = max(0, min(self.count - 1, self.selected + amount))
+        self.see(self.selected)
+        return "break"
+
+    def _sort(self, column):
+        if self.on_sort:
+            self.on_sort(column)
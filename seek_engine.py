@@ -0,0 +1,66 @@
+import time
+from collections import deque
+
+# 最后一次按键后等待多久再真正跳转音频(毫秒)
+SETTLE_MS = 150
+
+
+class SeekEngine:
+    """合并连续的跳转请求
+
+    单次按键立即跳转音频; 按住方向键时系统会连续发送按键,
+    之后的按键只更新播放时钟和歌词, 停止按键 settle_ms 毫秒后
+    再调用 seek_audio(位置) 跳转一次, 并记录每次音频跳转的耗时
+    """
+
+    def __init__(self, widget, get_position, seek_audio, settle_ms=SETTLE_MS):
+        self.widget = widget
+        self.get_position = get_position
+        self.seek_audio = seek_audio
+        self.settle_ms = settle_ms
+        self.job = None
+        self.dirty = False
+        self.requests = 0
+        self.seeks = 0
+        self.latencies = deque(maxlen=100)
+
+    def request(self):
+        """登记一次跳转"""
+        self.requests += 1
+        if self.job is None:
+            self._seek()
+        else:
+            self.dirty = True
+            self.widget.after_cancel(self.job)
+        self.job = self.widget.after(self.settle_ms, self._settle)
+
+    def cancel(self):
+        if self.job is not None:
+            self.widget.after_cancel(self.job)
+            self.job = None
+        self.dirty = False
+
+    def _settle(self):
+        self.job = None
+        if self.dirty:
+            self.dirty = False
+            self._seek()
+
+    def _seek(self):
+        start = time.perf_counter()
+        self.seek_audio(self.get_position())
+        self.latencies.append(time.perf_counter() - start)
+        self.seeks += 1
+
+    def stats(self):
+        """返回跳转统计, 耗时单位为毫秒"""
+        latencies = sorted(self.latencies)
+        if not latencies:
+            return {"requests": self.requests, "seeks": self.seeks}
+        return {
+            "requests": self.requests,
+            "seeks": self.seeks,
+            "last_ms": round(self.latencies[-1] * 1000, 2),
+            "median_ms": round(latencies[len(latencies) // 2] * 1000, 2),
+            "max_ms": round(latencies[-1] * 1000, 2),
+        }
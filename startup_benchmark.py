@@ -0,0 +1,126 @@
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+# 启动时不应该加载的重量级模块
+HEAVY_MODULES = ('pygame', 'pystray', 'PIL', 'sqlite3', 'lyrics_display')
+
+# -X importtime 的输出: "import time:  自身(us) |  累计(us) | 模块名"
+_IMPORT_TIME = re.compile(r'import time:\s+(\d+)\s+\|\s+(\d+)\s+\|\s*(\S+)')
+
+# 在子进程中运行: 导入程序, 创建主窗口并等待第一次绘制完成
+_FIRST_PAINT = r'''
+import json, sys, time
+start = time.perf_counter()
+from main_window import MainWindow
+imported = time.perf_counter()
+app = MainWindow()
+# 不保存测试窗口的位置
+app.unbind("<Configure>")
+app.wait_visibility()
+app.update_idletasks()
+painted = time.perf_counter()
+heavy = [name for name in %r if name in sys.modules]
+app.destroy()
+print(json.dumps({
+    "import_ms": (imported - start) * 1000,
+    "first_paint_ms": (painted - start) * 1000,
+    "heavy_modules": heavy,
+}))
+'''
+
+ROOT = os.path.dirname(os.path.realpath(__file__))
+
+
+def _last_error(result):
+    lines = result.stderr.strip().splitlines()
+    return lines[-1] if lines else f"退出码 {result.returncode}"
+
+
+def measure_imports(module='lrc_player'):
+    """在新进程中用 -X importtime 导入 module, 返回 {模块名: (自身毫秒, 累计毫秒)}"""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            cwd=ROOT, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(_last_error(result))
+    times = {}
+    for line in result.stderr.splitlines():
+        match = _IMPORT_TIME.match(line)
+        if match:
+            self_us, cumulative_us, name = match.groups()
+            times[name] = (int(self_us) / 1000, int(cumulative_us) / 1000)
+    return times
+
+
+def measure_first_paint():
+    """在新进程中测量从开始导入到主窗口第一次绘制的时间"""
+    result = subprocess.run([sys.executable, '-c', _FIRST_PAINT % (HEAVY_MODULES,)],
+                            cwd=ROOT, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(_last_error(result))
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def run_benchmark(runs=5, top=15):
+    imports = measure_imports()
+    slowest = sorted(imports.items(), key=lambda item: item[1][0], reverse=True)[:top]
+    report = {
+        "python": sys.version.split()[0],
+        "import_total_ms": round(imports.get('lrc_player', (0, 0))[1], 2),
+        "slowest_imports": [
+            {"module": name, "self_ms": round(self_ms, 2), "cumulative_ms": round(cumulative_ms, 2)}
+            for name, (self_ms, cumulative_ms) in slowest
+        ],
+        "heavy_modules_at_import": [name for name in HEAVY_MODULES if name in imports],
+    }
+
+    try:
+        samples = [measure_first_paint() for _ in range(runs)]
+    except RuntimeError as e:
+        # 没有图形界面时只能测量导入时间
+        print(f"无法创建窗口, 跳过首次绘制测量: {e}")
+    else:
+        paint = [sample["first_paint_ms"] for sample in samples]
+        report["first_paint_ms"] = {
+            "runs": runs,
+            "median": round(statistics.median(paint), 2),
+            "min": round(min(paint), 2),
+            "max": round(max(paint), 2),
+        }
+        report["import_ms_median"] = round(statistics.median(s["import_ms"] for s in samples), 2)
+        report["heavy_modules_at_first_paint"] = samples[-1]["heavy_modules"]
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="测量 lrc_player 的启动时间")
+    parser.add_argument("-n", "--runs", type=int, default=5, help="首次绘制测量次数 (默认 5)")
+    parser.add_argument("--top", type=int, default=15, help="列出最慢的模块数 (默认 15)")
+    parser.add_argument("-o", "--output", help="把结果保存为 JSON 文件")
+    args = parser.parse_args(argv)
+
+    report = run_benchmark(args.runs, args.top)
+
+    print(f"导入 lrc_player: {report['import_total_ms']:.1f} ms")
+    if "first_paint_ms" in report:
+        paint = report["first_paint_ms"]
+        print(f"首次绘制: 中位数 {paint['median']:.1f} ms "
+              f"(最快 {paint['min']:.1f} ms, 最慢 {paint['max']:.1f} ms, {paint['runs']} 次)")
+    heavy = report.get("heavy_modules_at_first_paint", report["heavy_modules_at_import"])
+    print(f"启动时加载的重量级模块: {', '.join(heavy) if heavy else '无'}")
+    print("最慢的模块 (自身 / 累计 ms):")
+    for item in report["slowest_imports"]:
+        print(f"  {item['module']:<30} {item['self_ms']:>8.2f} {item['cumulative_ms']:>8.2f}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=4, ensure_ascii=False)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,169 @@
+import hashlib
+import json
+import os
+import struct
+import sys
+import tempfile
+from array import array
+from config_manager import get_cache_dir
+from lyric_timeline import LyricTimeline
+from mapped_timeline import MappedTimeline
+from subtitle_loader import load_subtitle
+
+# 默认缓存上限 64MB
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+# 超过 32MB 的字幕不完整解析, 直接内存映射
+DEFAULT_MMAP_THRESHOLD = 32 * 1024 * 1024
+
+# 文件头: 魔数, 版本, 歌词数量, 文本字节数, 标签(JSON)字节数
+_MAGIC = b'LRCT'
+_VERSION = 2
+_HEADER = struct.Struct('<4sHIII')
+_SEP = '\x00'
+
+
+class SubtitleCache:
+    """解析后字幕时间轴的磁盘缓存
+
+    以绝对路径、文件大小和修改时间作为键, 时间轴以紧凑的二进制格式
+    保存在缓存目录中, 命中时直接读回 array 和文本, 不再解析字幕文本。
+    超过 max_bytes 时按最近使用时间淘汰。
+    不小于 mmap_threshold 的字幕文件(如几天的会议字幕)不解析也不缓存,
+    返回按需解码的 MappedTimeline, 为 0 时不使用内存映射
+    """
+
+    def __init__(self, cache_dir=None, max_bytes=DEFAULT_MAX_BYTES, mmap_threshold=DEFAULT_MMAP_THRESHOLD):
+        if cache_dir is None:
+            cache_dir = os.path.join(get_cache_dir(), 'subtitles')
+        os.makedirs(cache_dir, exist_ok=True)
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.mmap_threshold = mmap_threshold
+        self.hits = 0
+        self.misses = 0
+        self.mapped = 0
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "mapped": self.mapped}
+
+    def _entry_path(self, path):
+        path = os.path.abspath(path)
+        st = os.stat(path)
+        key = f"{path}\0{st.st_size}\0{st.st_mtime_ns}".encode('utf-8', 'surrogatepass')
+        return os.path.join(self.cache_dir, hashlib.sha1(key).hexdigest() + '.bin')
+
+    def load(self, path):
+        """读取字幕时间轴, 优先使用缓存"""
+        if self.mmap_threshold and os.path.getsize(path) >= self.mmap_threshold:
+            self.mapped += 1
+            return MappedTimeline(path)
+        entry_path = self._entry_path(path)
+        timeline = self.get(entry_path)
+        if timeline is not None:
+            self.hits += 1
+            return timeline
+        self.misses += 1
+        timeline = load_subtitle(path)
+        self.put(entry_path, timeline)
+        return timeline
+
+    def get(self, entry_path):
+        try:
+            with open(entry_path, 'rb') as f:
+                data = f.read()
+        except OSError:
+            return None
+        try:
+            magic, version, count, text_size, meta_size = _HEADER.unpack_from(data)
+        except struct.error:
+            return None
+        if magic != _MAGIC or version != _VERSION:
+            return None
+
+        offset = _HEADER.size
+        times = array('d')
+        times.frombytes(data[offset:offset + count * times.itemsize])
+        if sys.byteorder != 'little':
+            times.byteswap()
+        offset += count * times.itemsize
+        texts = data[offset:offset + text_size].decode('utf-8').split(_SEP) if count else []
+        if len(times) != count or len(texts) != count:
+            return None
+        offset += text_size
+        try:
+            metadata = json.loads(data[offset:offset + meta_size]) if meta_size else {}
+        except ValueError:
+            return None
+
+        # 更新修改时间, 作为 LRU 的最近使用时间
+        try:
+            os.utime(entry_path)
+        except OSError:
+            pass
+        return LyricTimeline(times, texts, metadata)
+
+    def put(self, entry_path, timeline):
+        # 逐字时间戳写回文本中, 读取时由 LyricTimeline 重新拆分
+        texts = timeline.source_texts()
+        if any(_SEP in text for text in texts):
+            return
+        times = array('d', timeline.times)
+        if sys.byteorder != 'little':
+            times.byteswap()
+        text_data = _SEP.join(texts).encode('utf-8')
+        meta_data = json.dumps(timeline.metadata, ensure_ascii=False).encode('utf-8') if timeline.metadata else b''
+        tmp_path = None
+        try:
+            # 先写临时文件再改名, 避免其他进程读到写了一半的缓存
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(_HEADER.pack(_MAGIC, _VERSION, len(times), len(text_data), len(meta_data)))
+                f.write(times.tobytes())
+                f.write(text_data)
+                f.write(meta_data)
+            os.replace(tmp_path, entry_path)
+        except OSError as e:
+            print(f"写入字幕缓存失败: {e}")
+            # evict 只统计 .bin, 留下的临时文件不会被清理
+            if tmp_path is not None:
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+            return
+        self.evict()
+
+    def evict(self):
+        """总大小超过 max_bytes 时删除最久未使用的缓存"""
+        entries = []
+        total = 0
+        with os.scandir(self.cache_dir) as it:
+            for entry in it:
+                if entry.name.endswith('.bin'):
+                    st = entry.stat()
+                    entries.append((st.st_mtime, st.st_size, entry.path))
+                    total += st.st_size
+        if total <= self.max_bytes:
+            return
+        entries.sort()
+        for _, size, path in entries:
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+
+_cache = None
+
+
+def get_subtitle_cache(config=None):
+    """返回进程内共享的字幕缓存, 上限和内存映射阈值取自配置 cache 项"""
+    global _cache
+    if _cache is None:
+        cache_config = (config or {}).get("cache", {})
+        _cache = SubtitleCache(max_bytes=cache_config.get("max_bytes", DEFAULT_MAX_BYTES),
+                               mmap_threshold=cache_config.get("mmap_threshold", DEFAULT_MMAP_THRESHOLD))
+    return _cache
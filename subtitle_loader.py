@@ -0,0 +1,197 @@
+import os
+import re
+from itertools import islice, repeat
+from operator import add, contains, le
+from lyric_timeline import LyricTimeline, join_words, split_words
+from vtt2srt import iter_vtt_cues
+
+SUBTITLE_EXTENSIONS = ('.lrc', '.srt', '.vtt')
+
+# SRT 时间戳, 小时部分可省略: 01:02:03,456 / 02:03.456
+_CUE_TIME = re.compile(r'(?:(\d+):)?(\d{1,2}):(\d{1,2})[.,](\d{1,3})')
+
+# lrc 时间戳 [mm:ss.xx], 也接受 [mm:ss] 和 [mm:ss:xx]
+_LRC_TIME = re.compile(r'\[(\d+):(\d+(?:[.:]\d+)?)\]')
+
+# 常见的 lrc 每行只有一个时间戳, 用时间戳切分整个文件,
+# 时间和歌词按列批量转换, 遇到其他写法时交给 _LRC_LINE 逐项解析
+_LRC_SPLIT = re.compile(r'\[(\d+):([\d.]+)\]')
+
+# lrc 的一项: 一个或多个时间戳加歌词, 或者 [ti:标题] 这样的标签
+_LRC_LINE = re.compile(
+    r'\[(?:(\d+):(\d+(?:[.:]\d+)?)\]((?:[ \t]*\[\d+:\d+(?:[.:]\d+)?\])*)(.*)'
+    r'|([A-Za-z#]+):([^\]\r\n]*)\])')
+
+def find_subtitle(music_file, exists=os.path.exists):
+    """按常见命名格式查找音乐文件对应的字幕, 找不到返回 None
+
+    exists 判断路径是否存在, 扫描文件夹时可以传入目录列表的查找函数, 不再逐个访问磁盘
+    """
+    base_name = os.path.splitext(music_file)[0]
+    music_name = os.path.basename(music_file)
+    lyrics_dir = os.path.join(os.path.dirname(music_file), 'lyrics')
+    possible_lyrics = [
+        base_name + '.lrc',                    # a.lrc
+        base_name + '.srt',                    # a.srt
+        base_name + '.vtt',                    # a.vtt
+        music_file + '.lrc',                   # a.mp3.lrc
+        music_file + '.srt',                   # a.mp3.srt
+        music_file + '.vtt',                   # a.mp3.vtt
+        os.path.join(lyrics_dir, os.path.basename(base_name) + '.lrc'),    # lyrics/a.lrc
+        os.path.join(lyrics_dir, music_name + '.lrc'),                     # lyrics/a.mp3.lrc
+    ]
+    for possible_file in possible_lyrics:
+        if exists(possible_file):
+            return possible_file
+    return None
+
+
+def load_subtitle(path):
+    """读取 lrc/srt/vtt 字幕, 直接解析为内存中的 LyricTimeline, 不写任何文件"""
+    ext = os.path.splitext(path)[1].lower()
+    with open(path, 'r', encoding='utf-8-sig') as file:
+        if ext == '.srt':
+            return LyricTimeline.from_pairs(parse_srt(file))
+        if ext == '.vtt':
+            return LyricTimeline.from_pairs(
+                (start, text.replace('\n', ' ')) for start, end, text in iter_vtt_cues(file))
+        metadata = {}
+        times, texts = parse_lrc(file.read(), metadata)
+        return LyricTimeline(times, texts, metadata)
+
+
+def parse_lrc(content, metadata=None):
+    """解析 lrc 歌词文本, 返回按时间排序的 (时间列表, 文本列表)
+
+    content 可以是整个文件的字符串或行的序列。一行有多个时间戳时
+    展开为多句, [offset:毫秒] 会应用到所有时间上(包括逐字时间),
+    [ti:]/[ar:] 等其他标签存入 metadata 字典。
+    不逐行 split, 已经有序时不再排序
+    """
+    if not isinstance(content, str):
+        content = ''.join(content)
+    if content.startswith('\ufeff'):
+        content = content[1:]
+    if metadata is None:
+        metadata = {}
+
+    result = _parse_lrc_columns(content, metadata)
+    if result is None:
+        result = _parse_lrc_items(content, metadata)
+    times, texts = result
+
+    offset = metadata.pop('offset', '').strip()
+    try:
+        offset = int(offset) / 1000 if offset else 0
+    except ValueError:
+        offset = 0
+    if offset:
+        # 正的 offset 表示歌词提前显示
+        texts = [_shift_words(text, t, offset) for t, text in zip(times, texts)]
+        times = [max(0.0, t - offset) for t in times]
+    if not all(map(le, times, islice(times, 1, None))):
+        order = sorted(range(len(times)), key=times.__getitem__)
+        times = [times[i] for i in order]
+        texts = [texts[i] for i in order]
+    return times, texts
+
+
+def _parse_lrc_columns(content, metadata):
+    """每行一个时间戳时的快速解析, 其他写法返回 None"""
+    tokens = _LRC_SPLIT.split(content)
+    chunks = tokens[3::3]
+    if not chunks:
+        return None
+    # 每段歌词都应该以换行结束(最后一段除外), 否则是同一行有多个时间戳
+    if not all(map(contains, chunks[:-1], repeat('\n'))):
+        return None
+    texts = list(map(str.strip, chunks))
+    # 去掉首尾空白后仍有换行, 说明两句之间还有标签或其他内容
+    if '\n' in '\0'.join(texts):
+        return None
+    minutes = tokens[1::3]
+    try:
+        # 不同的分钟数很少, 每种只转换一次
+        minute_seconds = {m: int(m) * 60 for m in set(minutes)}
+        times = list(map(add, map(minute_seconds.__getitem__, minutes), map(float, tokens[2::3])))
+    except ValueError:
+        return None
+    # 第一句之前只应该有标签, 还有 [mm:ss:xx] 等时间戳时交给逐项解析
+    items = _LRC_LINE.findall(tokens[0])
+    if not all(item[4] for item in items):
+        return None
+    for item in items:
+        _add_tag(metadata, item[4], item[5])
+    return times, texts
+
+
+def _parse_lrc_items(content, metadata):
+    """逐项解析, 支持一行多个时间戳和出现在任意位置的标签"""
+    times = []
+    texts = []
+    for minutes, seconds, more, text, key, value in _LRC_LINE.findall(content):
+        if key:
+            _add_tag(metadata, key, value)
+            continue
+        text = text.strip()
+        times.append(int(minutes) * 60 + _lrc_seconds(seconds))
+        texts.append(text)
+        # 多个时间戳共用一句歌词
+        for minutes, seconds in _LRC_TIME.findall(more):
+            times.append(int(minutes) * 60 + _lrc_seconds(seconds))
+            texts.append(text)
+    return times, texts
+
+
+def _lrc_seconds(seconds):
+    try:
+        return float(seconds)
+    except ValueError:
+        return float(seconds.replace(':', '.'))  # [mm:ss:xx]
+
+
+def _add_tag(metadata, key, value):
+    if key:
+        metadata[key.lower()] = value.strip()
+
+
+def _shift_words(text, line_time, offset):
+    """把增强 lrc 的逐字时间戳提前 offset 秒"""
+    if '<' not in text:
+        return text
+    plain, words = split_words(text, line_time)
+    if not words:
+        return text
+    return join_words((max(0.0, t - offset), word) for t, word in words)
+
+
+def parse_cue_time(time_str):
+    """把 SRT 时间戳转换为秒, 无法解析返回 None"""
+    match = _CUE_TIME.match(time_str.strip())
+    if not match:
+        return None
+    hh, mm, ss, ms = match.groups()
+    return int(hh or 0) * 3600 + int(mm) * 60 + int(ss) + int(ms.ljust(3, '0')) / 1000
+
+
+def parse_srt(lines):
+    """解析 SRT 字幕块, 生成 (开始秒数, 文本)
+
+    只认包含 '-->' 的时间行, 序号行会被跳过, 多行字幕用空格拼接
+    """
+    start = None
+    text_lines = []
+    for line in lines:
+        line = line.strip()
+        if not line:
+            if start is not None:
+                yield start, ' '.join(text_lines)
+            start = None
+            text_lines = []
+        elif start is None:
+            if '-->' in line:
+                start = parse_cue_time(line.split('-->', 1)[0])
+        else:
+            text_lines.append(line)
+    if start is not None:
+        yield start, ' '.join(text_lines)
@@ -0,0 +1,92 @@
+import unittest
+from headless import HeadlessPlayer, synthetic_script, synthetic_tracks
+from playback_engine import BOUNDARY_POLL_INTERVAL
+
+# 定时器按整毫秒向上取整, 歌词显示最多晚几毫秒
+MAX_LATENCY = 0.005
+
+
+class HeadlessPlaybackTest(unittest.TestCase):
+    """用虚拟时钟播放几首生成的歌曲, 结果完全可重复"""
+
+    def play(self, tracks, script=()):
+        player = HeadlessPlayer(tracks)
+        player.run(script)
+        self.assertTrue(player.finished)
+        self.assertEqual(player.index, len(tracks) - 1)
+        return player
+
+    def assert_gapless(self, player, tracks):
+        # 第一首由 load_track 打开, 之后每首的字幕只在预加载时解析一次,
+        # 音频只加载一次, 其余歌曲都通过播放队列无缝切换
+        self.assertEqual([name for _, name in player.switches], [track[0] for track in tracks[1:]])
+        self.assertEqual(player.lyric_loads, len(tracks) - 1)
+        self.assertEqual(player.audio.loads, 1)
+
+    def test_hand_over_at_track_boundaries(self):
+        tracks = synthetic_tracks(4, seed=3)
+        player = self.play(tracks)
+        self.assert_gapless(player, tracks)
+
+        boundary = 0.0
+        for (switched_at, name), track in zip(player.switches, tracks):
+            boundary += track[2]
+            self.assertGreaterEqual(switched_at, boundary)
+            self.assertLess(switched_at - boundary, BOUNDARY_POLL_INTERVAL / 1000 + 0.001)
+
+        self.assertEqual(len(player.latencies), sum(len(track[1]) for track in tracks))
+        self.assertLess(max(player.latencies), MAX_LATENCY)
+        self.assertEqual(player.audio.plays, 1)
+
+    def test_scripted_seeks(self):
+        tracks = synthetic_tracks(4, seed=3)
+        script = synthetic_script(sum(track[2] for track in tracks), 30, seed=3)
+        player = self.play(tracks, script)
+        self.assert_gapless(player, tracks)
+
+        self.assertTrue(player.latencies)
+        self.assertLess(max(player.latencies), MAX_LATENCY)
+        # 连续按键合并后, 音频跳转次数少于跳转请求, 每次跳转只调用一次 play
+        seek_engine = player.engine.seek_engine
+        self.assertLess(seek_engine.seeks, seek_engine.requests)
+        self.assertEqual(player.audio.plays, 1 + seek_engine.seeks)
+        # 等待合并的跳转期间不用旧的音频位置校准时钟
+        self.assertLess(player.stats.snapshot()["clock_drift"]["max_ms"], MAX_LATENCY * 1000)
+
+    def test_queued_track_removed_from_playlist(self):
+        tracks = synthetic_tracks(4, seed=5)
+        player = HeadlessPlayer(tracks)
+        player.play_current()
+        player.loop.run_until(tracks[0][2] - 5)
+        self.assertEqual(player.audio.queued, "track1.mp3")
+
+        # 已加入队列的下一首被删除, 队列换成新的下一首, 不重新加载音频
+        removed = tracks.pop(1)
+        player.engine.forget_next_track({removed[0]})
+        self.assertEqual(player.audio.queued, "track2.mp3")
+        player.run_until_finished()
+        self.assertEqual([name for _, name in player.switches], ["track2.mp3", "track3.mp3"])
+        self.assertEqual(player.audio.loads, 1)
+
+    def test_last_queued_track_removed_from_playlist(self):
+        tracks = synthetic_tracks(2, seed=5)
+        player = HeadlessPlayer(tracks)
+        player.play_current()
+        player.loop.run_until(tracks[0][2] - 5)
+        position = player.engine.get_current_time()
+
+        # 没有可以替换的下一首时不打断当前歌曲, 播放到边界时停止
+        removed = tracks.pop(1)
+        player.engine.forget_next_track({removed[0]})
+        self.assertEqual(player.audio.queued, "track1.mp3")
+        self.assertAlmostEqual(player.engine.get_current_time(), position, places=3)
+        player.run_until_finished()
+        self.assertTrue(player.finished)
+        self.assertEqual(player.switches, [])
+        self.assertEqual(player.audio.plays, 1)
+        self.assertFalse(player.audio.get_busy())
+        self.assertLess(player.clock() - tracks[0][2], BOUNDARY_POLL_INTERVAL / 1000 + 0.001)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,34 @@
+import unittest
+from subtitle_loader import parse_lrc
+
+
+class ParseLrcTest(unittest.TestCase):
+
+    def test_single_timestamps(self):
+        metadata = {}
+        times, texts = parse_lrc('[ti:标题]\n[00:01.50]a\n[00:02.00]b\n', metadata)
+        self.assertEqual(times, [1.5, 2.0])
+        self.assertEqual(texts, ['a', 'b'])
+        self.assertEqual(metadata, {'ti': '标题'})
+
+    def test_colon_separator_before_first_dot_timestamp(self):
+        # [mm:ss:xx] 在第一个 [mm:ss.xx] 之前时不能被当成标签丢掉
+        metadata = {}
+        times, texts = parse_lrc('[ar:歌手]\n[00:01:50]a\n[00:02:00]b\n[00:03.00]c\n', metadata)
+        self.assertEqual(times, [1.5, 2.0, 3.0])
+        self.assertEqual(texts, ['a', 'b', 'c'])
+        self.assertEqual(metadata, {'ar': '歌手'})
+
+    def test_colon_separator_after_dot_timestamp(self):
+        times, texts = parse_lrc('[00:01.00]a\n[00:02:50]b\n[00:03.00]c\n')
+        self.assertEqual(times, [1.0, 2.5, 3.0])
+        self.assertEqual(texts, ['a', 'b', 'c'])
+
+    def test_multiple_timestamps_and_offset(self):
+        times, texts = parse_lrc('[offset:500]\n[00:05.00][00:01.00]a\n[00:03.00]b\n')
+        self.assertEqual(times, [0.5, 2.5, 4.5])
+        self.assertEqual(texts, ['a', 'b', 'a'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,119 @@
+import os
+import sys
+
+# 找不到 icon.ico 时使用的默认图标: 16x16, 1 为主题蓝色 #4a90e2, 0 为白色
+_DEFAULT_ICON = (
+    "0000000000000000"
+    "0000011111100000"
+    "0000111111110000"
+    "0001111111111000"
+    "0011111111111100"
+    "0111111111111110"
+    "0111111111111110"
+    "0111111111111110"
+    "0111111111111110"
+    "0111111111111110"
+    "0111111111111110"
+    "0011111111111100"
+    "0001111111111000"
+    "0000111111110000"
+    "0000011111100000"
+    "0000000000000000"
+)
+
+_icon_image = None
+
+
+def create_default_icon():
+    """用遮罩一次性生成默认图标, 不逐像素写入"""
+    from PIL import Image
+
+    mask = Image.frombytes('L', (16, 16),
+                           _DEFAULT_ICON.encode().translate(bytes.maketrans(b'01', b'\x00\xff')))
+    image = Image.new('RGB', (16, 16), color='white')
+    image.paste((74, 144, 226), mask=mask)
+    return image
+
+
+def get_icon_image():
+    """返回托盘图标图像, 只从磁盘读取一次"""
+    global _icon_image
+    if _icon_image is None:
+        from PIL import Image
+
+        if getattr(sys, 'frozen', False):
+            icon_path = os.path.join(os.path.dirname(sys.argv[0]), 'icon.ico')
+        else:
+            icon_path = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'icon.ico')
+        try:
+            image = Image.open(icon_path)
+            image.load()
+        except FileNotFoundError:
+            # 如果找不到图标文件，使用默认图标
+            image = create_default_icon()
+        _icon_image = image
+    return _icon_image
+
+
+class TrayService:
+    """整个程序共用的系统托盘图标
+
+    播放期间托盘图标和它的线程只创建一次, 菜单操作转发给当前的歌词窗口(session),
+    换歌时只需 attach, 回到主界面时 stop, 下次 attach 时重新创建。
+    session 需要提供 show_window() 和 quit_program(), 并且是 Tk 控件:
+    菜单回调运行在托盘线程中, 通过 after 交给 Tk 主线程执行
+    """
+
+    def __init__(self):
+        self.icon = None
+        self.session = None
+
+    def attach(self, session):
+        """把菜单操作转发给 session, 第一次调用时启动托盘图标"""
+        self.session = session
+        if self.icon is None:
+            self.start()
+
+    def detach(self, session):
+        """不再转发菜单操作, 窗口销毁后托盘线程中的点击不会再调用它"""
+        if self.session is session:
+            self.session = None
+
+    def start(self):
+        # 托盘相关的库在第一次需要托盘时才导入
+        import pystray
+
+        menu = (
+            pystray.MenuItem("显示", self._show),
+            pystray.MenuItem("退出", self._quit)
+        )
+        self.icon = pystray.Icon("lyrics", get_icon_image(), "LRC Player", menu)
+        self.icon.run_detached()
+
+    def stop(self):
+        """停止托盘图标, 重复调用无影响"""
+        icon, self.icon = self.icon, None
+        if icon is not None:
+            icon.stop()
+
+    def _dispatch(self, method):
+        session = self.session
+        if session is not None:
+            session.after(0, getattr(session, method))
+
+    def _show(self, icon=None, item=None):
+        self._dispatch("show_window")
+
+    def _quit(self, icon=None, item=None):
+        self._dispatch("quit_program")
+
+
+_tray_service = None
+
+
+def get_tray_service():
+    """返回全局共享的托盘服务"""
+    global _tray_service
+    if _tray_service is None:
+        _tray_service = TrayService()
+    return _tray_service
@@ -0,0 +1,75 @@
+import time
+from collections import deque
+
+# 控件尚未渲染过的标记
+_UNSET = object()
+
+
+class ViewModel:
+    """播放引擎和 Tk 控件之间的视图模型
+
+    引擎只调用 set(名称, 值) 修改状态, 同一帧内的多次修改在空闲时
+    合并为一次渲染, 渲染时与上次的输出比较, 只有值真正变化的控件
+    才调用 configure。同时统计控件更新次数, 用来确认两句歌词之间
+    窗口没有多余的刷新
+    """
+
+    def __init__(self, widget):
+        self.widget = widget
+        self.bindings = {}
+        self.state = {}
+        self.rendered = {}
+        self.job = None
+
+        # 统计
+        self.frames = 0
+        self.updates = 0
+        self.recent = deque()
+
+    def bind(self, name, target, option="text"):
+        """把状态 name 绑定到控件 target 的 option 选项
+
+        option 为 None 时 target 是函数, 渲染时以新值调用。
+        没有绑定的状态只记录, 不渲染
+        """
+        self.bindings[name] = (target, option)
+
+    def set(self, name, value):
+        """修改状态, 在下一帧统一渲染"""
+        self.state[name] = value
+        if self.job is None and self.rendered.get(name, _UNSET) != value:
+            self.job = self.widget.after_idle(self.render)
+
+    def render(self):
+        """把变化的状态写入控件"""
+        self.job = None
+        self.frames += 1
+        now = time.monotonic()
+        for name, value in self.state.items():
+            if self.rendered.get(name, _UNSET) == value:
+                continue
+            self.rendered[name] = value
+            binding = self.bindings.get(name)
+            if binding is None:
+                continue
+            target, option = binding
+            if option is None:
+                target(value)
+            else:
+                target.configure(**{option: value})
+            self.updates += 1
+            self.recent.append(now)
+
+    def updates_per_second(self):
+        """最近一秒内的控件更新次数"""
+        limit = time.monotonic() - 1.0
+        while self.recent and self.recent[0] < limit:
+            self.recent.popleft()
+        return len(self.recent)
+
+    def stats(self):
+        return {
+            "frames": self.frames,
+            "updates": self.updates,
+            "updates_per_second": self.updates_per_second(),
+        }
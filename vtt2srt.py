@@ -2,30 +2,97 @@ import os
 import re
 import sys
 import io
-from stat import *
+
+
+# timing line: 00:01:02.345 --> 00:01:04.000 align:start position:0%
+_TIMING = re.compile(
+    r'\s*((?:\d+:)?\d{1,2}:\d{2}\.\d{3})\s+-->\s+((?:\d+:)?\d{1,2}:\d{2}\.\d{3})')
+# inline tags: <c.colorE5E5E5> </c> <00:00:01.234> <i> ...
+_TAG = re.compile(r'<[^>]*>')
+# blocks that are not cues
+_SKIP_BLOCKS = ('NOTE', 'STYLE', 'REGION')
+
+
+def parseTimestamp(strTime):
+    # hh:mm:ss.mmm or mm:ss.mmm to seconds
+    parts = strTime.split(':')
+    seconds = float(parts[-1])
+    if len(parts) == 3:
+        return int(parts[0]) * 3600 + int(parts[1]) * 60 + seconds
+    return int(parts[0]) * 60 + seconds
+
+
+def formatTimestamp(seconds):
+    # seconds to srt hh:mm:ss,mmm
+    ms = int(round(seconds * 1000))
+    hh, ms = divmod(ms, 3600000)
+    mm, ms = divmod(ms, 60000)
+    ss, ms = divmod(ms, 1000)
+    return '%02d:%02d:%02d,%03d' % (hh, mm, ss, ms)
+
+
+def iter_vtt_cues(lines):
+    '''parse WebVTT lines in a single pass and yield (start, end, text)
+       cues, start and end in seconds, text with inline tags removed.
+       only the current cue is kept in memory'''
+
+    start = None
+    end = None
+    text = []
+    skipping = False
+    first = True
+
+    for line in lines:
+        line = line.rstrip('\r\n')
+
+        if first:
+            # WEBVTT header and the Kind/Language metadata after it
+            first = False
+            line = line.lstrip('\ufeff')
+            if line.startswith('WEBVTT'):
+                skipping = True
+                continue
+
+        if not line.strip():
+            if start is not None:
+                yield start, end, '\n'.join(text)
+            start = None
+            text = []
+            skipping = False
+            continue
+
+        if skipping:
+            continue
+
+        if start is None:
+            match = _TIMING.match(line)
+            if match:
+                # cue settings after the timing are ignored
+                start = parseTimestamp(match.group(1))
+                end = parseTimestamp(match.group(2))
+            elif line.startswith(_SKIP_BLOCKS):
+                skipping = True
+            # anything else is a cue identifier
+            continue
+
+        line = _TAG.sub('', line).rstrip()
+        if line:
+            text.append(line)
+
+    if start is not None:
+        yield start, end, '\n'.join(text)
+
+
+def iter_srt_blocks(cues):
+    # format (start, end, text) cues as srt blocks
+    for index, (start, end, text) in enumerate(cues, 1):
+        yield '%d\n%s --> %s\n%s\n\n' % (
+            index, formatTimestamp(start), formatTimestamp(end), text)
 
 
 def convertContent(fileContents):
 
-    replacement = re.sub(
-        r'(\d\d:\d\d:\d\d).(\d\d\d) --> (\d\d:\d\d:\d\d).(\d\d\d)(?:[ \-\w]+:[\w\%\d:]+)*\n', r'\1,\2 --> \3,\4\n', fileContents)
-    replacement = re.sub(
-        r'(\d\d:\d\d).(\d\d\d) --> (\d\d:\d\d).(\d\d\d)(?:[ \-\w]+:[\w\%\d:]+)*\n', r'\1,\2 --> \3,\4\n', replacement)
-    replacement = re.sub(
-        r'(\d\d).(\d\d\d) --> (\d\d).(\d\d\d)(?:[ \-\w]+:[\w\%\d:]+)*\n', r'\1,\2 --> \3,\4\n', replacement)
-    replacement = re.sub(r'WEBVTT\n\n', '', replacement)
-    replacement = re.sub(r'Kind:[ \-\w]+\n', '', replacement)
-    replacement = re.sub(r'Language:[ \-\w]+\n', '', replacement)
-    # replacement = re.sub(r'^\d+\n', '', replacement)
-    # replacement = re.sub(r'\n\d+\n', '\n', replacement)
-    replacement = re.sub(r'<c[.\w\d]*>', '', replacement)
-    replacement = re.sub(r'</c>', '', replacement)
-    replacement = re.sub(r'<\d\d:\d\d:\d\d.\d\d\d>', '', replacement)
-    replacement = re.sub(
-        r'::[\-\w]+\([\-.\w\d]+\)[ ]*{[.,:;\(\) \-\w\d]+\n }\n', '', replacement)
-    replacement = re.sub(r'Style:\n##\n', '', replacement)
-
-    return replacement
+    return ''.join(iter_srt_blocks(iter_vtt_cues(fileContents.splitlines())))
 
 
 def fileCreate(strNamaFile, strData):
@@ -58,56 +125,65 @@ def readTextFile(strNamaFile):
     return f.read()
 
 
-def vtt_to_srt(strNamaFile):
+def vtt_to_srt(strNamaFile, strSrtFile=None):
+    # output defaults to the input path with the extension replaced by .srt
 
-    fileContents = readTextFile(strNamaFile)
+    if strSrtFile is None:
+        strSrtFile = os.path.splitext(strNamaFile)[0] + '.srt'
 
-    strData = ""
+    # the output is written while the input is still being read
+    if os.path.abspath(strSrtFile) == os.path.abspath(strNamaFile):
+        raise ValueError('output would overwrite the input: %s' % strNamaFile)
 
-    strData = strData + convertContent(fileContents)
+    with open(strNamaFile, mode='r', encoding='utf-8') as fin:
 
-    strNamaFile = strNamaFile.replace(".vtt", ".srt")
+        try:
+            fout = open(strSrtFile, "w", encoding='utf-8')
+        except IOError:
+            strSrtFile = strSrtFile.split(os.sep)[-1]
+            if os.path.abspath(strSrtFile) == os.path.abspath(strNamaFile):
+                raise
+            fout = open(strSrtFile, "w", encoding='utf-8')
 
-    # print(strNamaFile)
-
-    fileCreate(strNamaFile, strData)
+        with fout:
+            # written cue by cue, only one cue is held in memory
+            fout.writelines(iter_srt_blocks(iter_vtt_cues(fin)))
 
 
 def walktree(TopMostPath, callback):
     '''recursively descend the directory tree rooted at TopMostPath,
        calling the callback function for each regular file'''
 
-    for f in os.listdir(TopMostPath):
+    with os.scandir(TopMostPath) as entries:
 
-        pathname = os.path.join(TopMostPath, f)
-        mode = os.stat(pathname)[ST_MODE]
+        for entry in entries:
 
-        if S_ISDIR(mode):
+            if entry.is_dir(follow_symlinks=False):
 
-            # It's a directory, recurse into it
-            walktree(pathname, callback)
+                # It's a directory, recurse into it
+                walktree(entry.path, callback)
 
-        elif S_ISREG(mode):
+            elif entry.is_file(follow_symlinks=False):
 
-            # It's a file, call the callback function
-            callback(pathname)
+                # It's a file, call the callback function
+                callback(entry.path)
 
-        else:
+            else:
 
-            # Unknown file type, print a message
-            print('Skipping %s' % pathname)
+                # Unknown file type, print a message
+                print('Skipping %s' % entry.path)
 
 
 def walkdir(TopMostPath, callback):
-    for f in os.listdir(TopMostPath):
-        pathname = os.path.join(TopMostPath, f)
-        if not os.path.isdir(pathname):
-            # It's a file, call the callback function
-            callback(pathname)
+    with os.scandir(TopMostPath) as entries:
+        for entry in entries:
+            if not entry.is_dir():
+                # It's a file, call the callback function
+                callback(entry.path)
 
 
 def convertVTTtoSRT(f):
-    if '.vtt' in f:
+    if f.lower().endswith('.vtt'):
         vtt_to_srt(f)
 
 
@@ -121,9 +197,13 @@ def vtts_to_srt(directory, rec=False):
 
 if __name__ == '__main__':
 
-    path = 'aaa.vtt'
+    if len(sys.argv) < 2:
+        print('usage: vtt2srt.py <file.vtt | directory> [-r]')
+        sys.exit(1)
+
+    path = sys.argv[1]
 
     if os.path.isdir(path):
-        vtts_to_srt(path)
+        vtts_to_srt(path, '-r' in sys.argv[2:])
     else:
         vtt_to_srt(path)